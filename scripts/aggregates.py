@@ -0,0 +1,289 @@
+"""
+Tables derived from the star schema and maintained by the ETL as each chunk loads:
+
+- fact_property_current: the latest snapshot of every property, keyed by property_sk,
+  with its address, valuation estimate, tax amount, HOA fee and rehab total joined in,
+  so point lookups read one row instead of joining six tables.
+- agg_property_summary: one row per (state, city, property_type) with the property
+  count and valuation, tax and HOA rollups of the current snapshots in the group.
+  Each chunk changes only the groups its properties leave or join, so analytics
+  queries read a few thousand rows instead of grouping the star schema.
+"""
+import unicodedata
+from decimal import Decimal, ROUND_HALF_UP
+from collections import defaultdict
+
+CURRENT_TABLE = "fact_property_current"
+SUMMARY_TABLE = "agg_property_summary"
+GROUP_COLUMNS = ("state", "city", "property_type")
+ROLLUP_COLUMNS = ("property_count", "valuation_count", "valuation_sum", "valuation_min", "valuation_max",
+                  "tax_count", "tax_sum", "hoa_count", "hoa_fee_sum")
+_BOUNDS = ("valuation_min", "valuation_max")
+_SCALE = Decimal("0.01")
+
+# Current snapshot of each property: its fact with the latest effective_date, found
+# through the (property_sk, effective_date) unique key.
+_CURRENT_FACT = """
+    FROM fact_property_snapshot f
+    JOIN dim_property p ON p.property_sk = f.property_sk
+    JOIN dim_address a ON a.address_sk = f.address_sk
+    LEFT JOIN dim_valuation v ON v.valuation_sk = f.valuation_sk
+    LEFT JOIN dim_tax t ON t.tax_sk = f.tax_sk
+    LEFT JOIN dim_hoa h ON h.hoa_sk = f.hoa_sk
+    LEFT JOIN dim_rehab r ON r.rehab_sk = f.rehab_sk
+    WHERE f.effective_date = (SELECT MAX(f2.effective_date) FROM fact_property_snapshot f2
+                              WHERE f2.property_sk = f.property_sk)
+"""
+
+# The summary computed from scratch; seeds the table and lets validate.py --full check it.
+SUMMARY_FROM_STAR_SQL = f"""
+    SELECT COALESCE(a.state, '') AS state, COALESCE(a.city, '') AS city,
+           COALESCE(p.property_type, '') AS property_type,
+           COUNT(*) AS property_count,
+           COUNT(v.estimate) AS valuation_count, COALESCE(SUM(v.estimate), 0) AS valuation_sum,
+           MIN(v.estimate) AS valuation_min, MAX(v.estimate) AS valuation_max,
+           COUNT(t.tax_amount) AS tax_count, COALESCE(SUM(t.tax_amount), 0) AS tax_sum,
+           COUNT(h.hoa_monthly_fee) AS hoa_count, COALESCE(SUM(h.hoa_monthly_fee), 0) AS hoa_fee_sum
+    {_CURRENT_FACT}
+    GROUP BY COALESCE(a.state, ''), COALESCE(a.city, ''), COALESCE(p.property_type, '')
+"""
+
+# fact_property_current columns taken from dim_property; they follow its latest upsert.
+PROPERTY_COLUMNS = ("property_bk", "property_type", "year_built", "square_feet", "bedrooms", "bathrooms")
+# Columns following the latest snapshot: column -> (transformed row table, column).
+# The dimension surrogate keys and source record come from the fact itself.
+SNAPSHOT_COLUMNS = {
+    "address_line1": ("dim_address", "address_line1"),
+    "city": ("dim_address", "city"),
+    "state": ("dim_address", "state"),
+    "postal_code": ("dim_address", "postal_code"),
+    "latitude": ("dim_address", "latitude"),
+    "longitude": ("dim_address", "longitude"),
+    "valuation_estimate": ("dim_valuation", "estimate"),
+    "tax_amount": ("dim_tax", "tax_amount"),
+    "hoa_monthly_fee": ("dim_hoa", "hoa_monthly_fee"),
+    "rehab_total": ("dim_rehab", "total_estimate"),
+}
+SNAPSHOT_KEYS = ("address_sk", "hoa_sk", "valuation_sk", "rehab_sk", "tax_sk", "source_record_id", "source_file_id")
+
+# fact_property_current computed from scratch; fills the table when it is introduced.
+CURRENT_FROM_STAR_SQL = f"""
+    SELECT p.property_sk, {", ".join(f"p.{c}" for c in PROPERTY_COLUMNS)}, f.effective_date,
+           a.address_line1, a.city, a.state, a.postal_code, a.latitude, a.longitude,
+           v.estimate, t.tax_amount, h.hoa_monthly_fee, r.total_estimate,
+           {", ".join(f"f.{c}" for c in SNAPSHOT_KEYS)}
+    {_CURRENT_FACT}
+"""
+
+
+def amount(value):
+    """A DECIMAL(x,2) value as MySQL stores it, whether it comes from a row or the DB."""
+    if value is None:
+        return None
+    return Decimal(str(value)).quantize(_SCALE, rounding=ROUND_HALF_UP)
+
+def _date(value):
+    return value if isinstance(value, str) else value.isoformat()[:10]
+
+def fold_text(text):
+    """text folded for comparison like the DB collation (utf8mb4_0900_ai_ci): case- and accent-insensitive."""
+    return "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c)).casefold()
+
+def _group(state, city, property_type):
+    """Display value and match key of a group; NULLs group as '' and matching ignores case and accents like the DB."""
+    display = tuple("" if v is None else str(v) for v in (state, city, property_type))
+    return display, tuple(fold_text(v) for v in display)
+
+def _or_match(columns, count):
+    one = "(" + " AND ".join(f"{c} = %s" for c in columns) + ")"
+    return " OR ".join([one] * count)
+
+
+def row_contribution(row):
+    """(group display, estimate, tax amount, HOA fee) a transformed record adds to the summary."""
+    addr = row["dim_address"] or {}
+    val, tax, hoa = row["dim_valuation"], row["dim_tax"], row["dim_hoa"]
+    return (_group(addr.get("state"), addr.get("city"), row["dim_property"].get("property_type"))[0],
+            amount(val.get("estimate")) if val else None,
+            amount(tax.get("tax_amount")) if tax else None,
+            amount(hoa.get("hoa_monthly_fee")) if hoa else None)
+
+def upsert_current_snapshots(conn, rows, facts):
+    """
+    Upsert the fact_property_current row of each loaded record with one multi-row
+    INSERT ... ON DUPLICATE KEY UPDATE. facts are the fact tuples written for rows
+    (FACT_COLUMNS order). Property attributes always take the new values; the snapshot
+    columns only when the record's effective_date is not older than the stored one.
+    """
+    if not rows:
+        return
+    columns = ("property_sk", *PROPERTY_COLUMNS, *SNAPSHOT_COLUMNS, *SNAPSHOT_KEYS, "effective_date")
+    values = []
+    for r, (property_sk, address_sk, hoa_sk, valuation_sk, rehab_sk, tax_sk, eff, source_id, file_id) in zip(rows, facts):
+        prop = r["dim_property"]
+        values += [property_sk, *(prop.get(c) for c in PROPERTY_COLUMNS)]
+        values += [(r[table] or {}).get(c) for table, c in SNAPSHOT_COLUMNS.values()]
+        values += [address_sk, hoa_sk, valuation_sk, rehab_sk, tax_sk, source_id, file_id, eff]
+    newer = "VALUES(effective_date) >= effective_date"
+    # effective_date goes last: MySQL applies the assignments in order.
+    updates = ([f"{c}=VALUES({c})" for c in PROPERTY_COLUMNS]
+               + [f"{c}=CASE WHEN {newer} THEN VALUES({c}) ELSE {c} END"
+                  for c in (*SNAPSHOT_COLUMNS, *SNAPSHOT_KEYS, "effective_date")])
+    cur = conn.cursor()
+    cur.execute(f"INSERT INTO {CURRENT_TABLE} ({','.join(columns)}) VALUES "
+                + ",".join(["(" + ",".join(["%s"] * len(columns)) + ")"] * len(rows))
+                + f" ON DUPLICATE KEY UPDATE {','.join(updates)}", values)
+    cur.close()
+
+def read_contributions(conn, rows):
+    """
+    {property_bk: (effective_date, contribution)} of the current snapshot of the chunk's
+    properties that are already loaded. Read before the chunk is loaded, since loading
+    updates dim_property in place.
+    """
+    bks = list({r["dim_property"]["property_bk"] for r in rows})
+    if not bks:
+        return {}
+    cur = conn.cursor(buffered=True)
+    cur.execute("SELECT property_bk, effective_date, state, city, property_type, valuation_estimate, "
+                f"tax_amount, hoa_monthly_fee FROM {CURRENT_TABLE} "
+                f"WHERE property_bk IN ({','.join(['%s'] * len(bks))})", bks)
+    previous = {}
+    for bk, eff, state, city, ptype, estimate, tax, fee in cur.fetchall():
+        previous[bk] = (_date(eff), (_group(state, city, ptype)[0], amount(estimate), amount(tax), amount(fee)))
+    cur.close()
+    return previous
+
+def _new_contributions(rows, previous):
+    """Contribution of each of the chunk's properties once it is loaded, applying rows in order."""
+    current = dict(previous)
+    for r in rows:
+        bk = r["dim_property"]["property_bk"]
+        eff, contribution = _date(r["effective_date"]), row_contribution(r)
+        if bk in current and current[bk][0] > eff:
+            # An older snapshot leaves the current facts in place; only dim_property changes.
+            old_eff, (old_group, *old_values) = current[bk]
+            eff = old_eff
+            contribution = ((*old_group[:2], contribution[0][2]), *old_values)
+        current[bk] = (eff, contribution)
+    return {bk: contribution for bk, (_, contribution) in current.items()}
+
+def _read_summary_rows(cur, keys):
+    cur.execute(f"SELECT {','.join(GROUP_COLUMNS + ROLLUP_COLUMNS)} FROM {SUMMARY_TABLE} WHERE "
+                + _or_match(GROUP_COLUMNS, len(keys)), [v for key in keys for v in key])
+    stored = {}
+    for row in cur.fetchall():
+        display, key = _group(*row[:3])
+        values = dict(zip(ROLLUP_COLUMNS, row[3:]))
+        for c in ROLLUP_COLUMNS:
+            values[c] = int(values[c]) if c.endswith("_count") else amount(values[c])
+        stored[key] = values
+    return stored
+
+def _match_group(display):
+    """
+    WHERE condition and params matching a group's rows on GROUP_COLUMNS, leaving the
+    columns bare so the location index applies; '' matches NULL as well, as in _group().
+    """
+    conditions, params = [], []
+    for column, value in zip(GROUP_COLUMNS, display):
+        if value == "":
+            conditions.append(f"({column} = '' OR {column} IS NULL)")
+        else:
+            conditions.append(f"{column} = %s")
+            params.append(value)
+    return " AND ".join(conditions), params
+
+def _valuation_range(cur, display, exclude_bks, extra):
+    """MIN/MAX estimate of a group recomputed from the current snapshots, with the chunk's properties taken from extra."""
+    match, params = _match_group(display)
+    sql = (f"SELECT valuation_estimate FROM {CURRENT_TABLE} WHERE {match}"
+           f" AND property_bk NOT IN ({','.join(['%s'] * len(exclude_bks))})")
+    cur.execute(sql, [*params, *exclude_bks])
+    estimates = [amount(row[0]) for row in cur.fetchall() if row[0] is not None] + extra
+    return (min(estimates), max(estimates)) if estimates else (None, None)
+
+def update_property_summary(conn, rows, previous):
+    """
+    Apply a loaded chunk to agg_property_summary: subtract the previous contribution of
+    each of its properties (from read_contributions) and add the new one. Counts and
+    sums change by their deltas; a group's MIN/MAX estimate is recomputed only when a
+    removed estimate was its current bound. Runs in the chunk's transaction, after
+    upsert_current_snapshots().
+    """
+    after = _new_contributions(rows, previous)
+    deltas = {}
+    displays = {}
+    for bk, new in after.items():
+        old = previous.get(bk, (None, None))[1]
+        if old == new:
+            continue
+        for contribution, sign in ((old, -1), (new, 1)):
+            if contribution is None:
+                continue
+            display, estimate, tax, fee = contribution
+            key = _group(*display)[1]
+            displays[key] = display
+            d = deltas.setdefault(key, {"count": 0, "added": [], "removed": []})
+            d["count"] += sign
+            (d["added"] if sign > 0 else d["removed"]).append((estimate, tax, fee))
+    if not deltas:
+        return
+
+    cur = conn.cursor(buffered=True)
+    stored = _read_summary_rows(cur, [displays[key] for key in deltas])
+    chunk_estimates = defaultdict(list)
+    for contribution in after.values():
+        if contribution[1] is not None:
+            chunk_estimates[_group(*contribution[0])[1]].append(contribution[1])
+
+    upserts, emptied = [], []
+    for key, d in deltas.items():
+        s = stored.get(key) or {c: (0 if c.endswith("_count") else None if c in _BOUNDS else Decimal(0))
+                                for c in ROLLUP_COLUMNS}
+        s["property_count"] += d["count"]
+        for i, name, total in ((0, "valuation_count", "valuation_sum"), (1, "tax_count", "tax_sum"),
+                               (2, "hoa_count", "hoa_fee_sum")):
+            for values, sign in ((d["added"], 1), (d["removed"], -1)):
+                present = [v[i] for v in values if v[i] is not None]
+                s[name] += sign * len(present)
+                s[total] += sign * sum(present, Decimal(0))
+        if s["property_count"] <= 0:
+            emptied.append(displays[key])
+            continue
+        added = [v[0] for v in d["added"] if v[0] is not None]
+        removed = [v[0] for v in d["removed"] if v[0] is not None]
+        low, high = s["valuation_min"], s["valuation_max"]
+        if key in stored and removed and (low is None or min(removed) <= low or max(removed) >= high):
+            low, high = _valuation_range(cur, displays[key], list(after), chunk_estimates[key])
+        elif added:
+            low = min(added + ([low] if low is not None else []))
+            high = max(added + ([high] if high is not None else []))
+        s["valuation_min"], s["valuation_max"] = low, high
+        upserts.append((*displays[key], *(s[c] for c in ROLLUP_COLUMNS)))
+
+    if upserts:
+        columns = GROUP_COLUMNS + ROLLUP_COLUMNS
+        cur.execute(f"INSERT INTO {SUMMARY_TABLE} ({','.join(columns)}) VALUES "
+                    + ",".join(["(" + ",".join(["%s"] * len(columns)) + ")"] * len(upserts))
+                    + " ON DUPLICATE KEY UPDATE " + ",".join(f"{c}=VALUES({c})" for c in ROLLUP_COLUMNS),
+                    [v for row in upserts for v in row])
+    if emptied:
+        cur.execute(f"DELETE FROM {SUMMARY_TABLE} WHERE " + _or_match(GROUP_COLUMNS, len(emptied)),
+                    [v for display in emptied for v in display])
+    cur.close()
+
+def rebuild_property_current(conn):
+    """Recompute fact_property_current from the star schema (the migration that introduces it)."""
+    columns = ("property_sk", *PROPERTY_COLUMNS, "effective_date", *SNAPSHOT_COLUMNS, *SNAPSHOT_KEYS)
+    cur = conn.cursor()
+    cur.execute(f"DELETE FROM {CURRENT_TABLE}")
+    cur.execute(f"INSERT INTO {CURRENT_TABLE} ({','.join(columns)}) " + CURRENT_FROM_STAR_SQL)
+    cur.close()
+
+def rebuild_property_summary(conn):
+    """Recompute agg_property_summary from the star schema (the migration that introduces it)."""
+    cur = conn.cursor()
+    cur.execute(f"DELETE FROM {SUMMARY_TABLE}")
+    cur.execute(f"INSERT INTO {SUMMARY_TABLE} ({','.join(GROUP_COLUMNS + ROLLUP_COLUMNS)}) " + SUMMARY_FROM_STAR_SQL)
+    cur.close()
@@ -0,0 +1,227 @@
+"""
+End-to-end ETL benchmark on synthetic feeds.
+
+For each size a seeded feed is generated (and cached), then etl.main runs on it in a
+fresh process against an empty database: the in-process sqlite stand-in by default,
+or the MySQL database from .env with --backend mysql. Each run reports records/sec,
+database round trips (statements + commits) and the peak RSS of the ETL process.
+
+    python bench_etl.py --sizes 10000 100000 1000000
+    python bench_etl.py --sizes 10000 --save bench.json
+    python bench_etl.py --sizes 10000 --baseline bench.json -- --pipeline --engine columnar
+
+Arguments after "--" are passed to etl.py. With --baseline the run fails (exit 1)
+when records/sec drops, or round trips grow, by more than --tolerance.
+"""
+import os
+import re
+import sys
+import json
+import argparse
+import subprocess
+import tempfile
+from contextlib import redirect_stdout
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import write_feed
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SQL_DIR = os.path.join(SCRIPT_DIR, "..", "sql")
+DEFAULT_SIZES = (10000, 100000, 1000000)
+
+
+class CountingCursor:
+    def __init__(self, cur, counts):
+        self._cur = cur
+        self._counts = counts
+
+    def execute(self, *args, **kwargs):
+        self._counts["statements"] += 1
+        return self._cur.execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        self._counts["statements"] += 1
+        return self._cur.executemany(*args, **kwargs)
+
+    def __iter__(self):
+        return iter(self._cur)
+
+    def __getattr__(self, name):
+        return getattr(self._cur, name)
+
+
+class CountingConnection:
+    """Wraps a DB-API connection and counts the statements and commits sent through it."""
+    def __init__(self, conn, counts):
+        self._conn = conn
+        self._counts = counts
+
+    def cursor(self, *args, **kwargs):
+        return CountingCursor(self._conn.cursor(*args, **kwargs), self._counts)
+
+    def commit(self):
+        self._counts["commits"] += 1
+        return self._conn.commit()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MiB (None where resource is unavailable)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return round(peak / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+
+def etl_tables():
+    """Tables created by the schema files, in creation order."""
+    tables = []
+    for name in sorted(os.listdir(SQL_DIR)):
+        if name.endswith(".sql"):
+            with open(os.path.join(SQL_DIR, name), encoding="utf-8") as f:
+                tables += re.findall(r"CREATE TABLE IF NOT EXISTS (\w+)", f.read(), re.I)
+    return tables
+
+
+def reset_mysql():
+    """Drop every ETL table from the .env database so the run starts empty."""
+    from dotenv import load_dotenv
+    from etl import SCHEMA_MIGRATION_TABLE
+    from utils import get_conn
+    load_dotenv()
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("SET FOREIGN_KEY_CHECKS = 0")
+    for table in [SCHEMA_MIGRATION_TABLE] + list(reversed(etl_tables())):
+        cur.execute(f"DROP TABLE IF EXISTS {table}")
+    cur.execute("SET FOREIGN_KEY_CHECKS = 1")
+    conn.commit()
+    cur.close()
+    conn.close()
+
+
+def run_child(args):
+    """Run etl.main once in this process and print its measurements as one JSON line."""
+    import etl
+    counts = {"statements": 0, "commits": 0}
+    if args.backend == "standin":
+        import mysql_standin
+        connect = lambda: mysql_standin.connect(args.db)
+    else:
+        from utils import get_conn as connect
+    etl.get_conn = lambda: CountingConnection(connect(), counts)
+    etl.DATA_PATH = args.input
+
+    t0 = perf_counter()
+    with open(os.devnull, "w") as sink, redirect_stdout(sink):
+        etl.main(args.etl_args)
+    elapsed = perf_counter() - t0
+    print(json.dumps({
+        "records": args.child,
+        "seconds": round(elapsed, 3),
+        "records_per_sec": round(args.child / elapsed, 1) if elapsed else None,
+        "statements": counts["statements"],
+        "commits": counts["commits"],
+        "round_trips": counts["statements"] + counts["commits"],
+        "peak_rss_mb": peak_rss_mb(),
+    }))
+
+
+def ensure_feed(n, args):
+    """Path of the cached feed of n records for args.seed, generating it if missing."""
+    feed = os.path.join(args.feed_dir, f"synthetic_{n}_{args.seed}.jsonl")
+    if not os.path.exists(feed):
+        print(f"Generating {n} records -> {feed}")
+        write_feed(feed, n, seed=args.seed)
+    return feed
+
+
+def run_size(n, feed, args, workdir):
+    db = os.path.join(workdir, f"bench_{n}.sqlite")
+    if args.backend == "mysql":
+        reset_mysql()
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", str(n), "--input", feed,
+           "--db", db, "--backend", args.backend, "--", *args.etl_args]
+    out = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, text=True, cwd=SCRIPT_DIR).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def compare(results, baseline, tolerance):
+    """Return the regressions of results against a saved baseline."""
+    before = {r["records"]: r for r in baseline["results"]}
+    problems = []
+    for r in results:
+        b = before.get(r["records"])
+        if not b:
+            continue
+        if r["records_per_sec"] < b["records_per_sec"] * (1 - tolerance):
+            problems.append(f"{r['records']} records: {r['records_per_sec']:,.0f} rec/s "
+                            f"vs baseline {b['records_per_sec']:,.0f}")
+        if r["round_trips"] > b["round_trips"] * (1 + tolerance):
+            problems.append(f"{r['records']} records: {r['round_trips']} round trips "
+                            f"vs baseline {b['round_trips']}")
+    return problems
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the ETL end to end on synthetic feeds.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--backend", choices=("standin", "mysql"), default="standin",
+                        help="sqlite stand-in (default) or the .env MySQL database, whose ETL tables are dropped")
+    parser.add_argument("--feed-dir", default=tempfile.gettempdir(), help="Where generated feeds are cached")
+    parser.add_argument("--save", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", help="Results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="Allowed relative slowdown / round-trip growth vs the baseline (default 0.15)")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--input", help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    parser.add_argument("etl_args", nargs=argparse.REMAINDER, help="Options passed to etl.py after --")
+    args = parser.parse_args(argv)
+    if args.etl_args[:1] == ["--"]:
+        args.etl_args = args.etl_args[1:]
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.child:
+        run_child(args)
+        return
+
+    feeds = {n: ensure_feed(n, args) for n in args.sizes}
+    results = []
+    print(f"Backend: {args.backend}, etl.py options: {' '.join(args.etl_args) or '(defaults)'}")
+    print(f"{'records':>10}{'seconds':>10}{'rec/s':>12}{'statements':>12}{'commits':>9}{'peak RSS MiB':>14}")
+    with tempfile.TemporaryDirectory(prefix="bench_etl_") as workdir:
+        for n in args.sizes:
+            r = run_size(n, feeds[n], args, workdir)
+            results.append(r)
+            print(f"{r['records']:>10}{r['seconds']:>10.2f}{r['records_per_sec']:>12,.0f}"
+                  f"{r['statements']:>12}{r['commits']:>9}{r['peak_rss_mb'] or 0:>14.1f}")
+
+    report = {"backend": args.backend, "seed": args.seed, "etl_args": args.etl_args, "results": results}
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved results to {args.save}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            problems = compare(results, json.load(f), args.tolerance)
+        for p in problems:
+            print(f"  REGRESSION {p}")
+        if problems:
+            sys.exit(1)
+        print("No regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
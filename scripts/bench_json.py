@@ -0,0 +1,59 @@
+"""
+Micro-benchmark of the JSON codec against the stdlib json module on synthetic
+property records: decoding JSONL lines and encoding content fingerprints.
+Checks that both produce identical results before timing them.
+
+    python scripts/bench_json.py --records 20000 --repeat 5
+"""
+import os
+import sys
+import json
+import argparse
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import jsoncodec
+from synthetic import generate_records
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = perf_counter()
+        fn()
+        best = min(best, perf_counter() - t0)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the JSON codec with stdlib json.")
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    records = list(generate_records(args.records, args.seed))
+    lines = [json.dumps(r) for r in records]
+
+    if [jsoncodec.loads(s) for s in lines] != [json.loads(s) for s in lines]:
+        raise SystemExit("decoded records differ between backends")
+    std_dumps = [json.dumps(r, sort_keys=True, separators=(",", ":"), default=str) for r in records]
+    if [jsoncodec.dumps(r, sort_keys=True, default=str) for r in records] != std_dumps:
+        raise SystemExit("encoded records differ between backends")
+
+    cases = [
+        ("decode", lambda: [json.loads(s) for s in lines], lambda: [jsoncodec.loads(s) for s in lines]),
+        ("encode", lambda: [json.dumps(r, sort_keys=True, separators=(",", ":"), default=str) for r in records],
+                   lambda: [jsoncodec.dumps(r, sort_keys=True, default=str) for r in records]),
+    ]
+    print(f"{args.records} records, best of {args.repeat}, codec backend: {jsoncodec.BACKEND}")
+    print(f"{'op':<8}{'json rec/s':>14}{'codec rec/s':>14}{'speedup':>10}")
+    for name, std, fast in cases:
+        t_std = best_of(std, args.repeat)
+        t_fast = best_of(fast, args.repeat)
+        print(f"{name:<8}{args.records / t_std:>14,.0f}{args.records / t_fast:>14,.0f}{t_std / t_fast:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Vectorized pandas/NumPy counterparts of the scalar transform helpers.
+Every function returns plain Python objects equal in value and type to what the
+scalar helper in utils.py / etl.py returns, so both transform paths produce
+identical dimension rows.
+"""
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+# After cleaning only digits, '.' and '-' remain; these are exactly the strings float() accepts.
+_NUMBER_RE = r"-?(?:\d+\.?\d*|\.\d+)"
+_INT64_LIMIT = 2.0 ** 63
+
+
+def object_column(records, key, default=None):
+    """Column of rec.get(key) values, kept as Python objects (no NaN coercion)."""
+    return pd.Series([r.get(key, default) for r in records], dtype=object)
+
+
+def explode_lists(values):
+    """
+    Flatten a column of lists of dicts.
+    Returns (parent row positions, child dicts, mask of rows holding a non-empty list).
+    """
+    parents = []
+    children = []
+    has_list = np.zeros(len(values), dtype=bool)
+    for i, v in enumerate(values):
+        if isinstance(v, list) and v:
+            has_list[i] = True
+            parents.extend([i] * len(v))
+            children.extend(v)
+    return np.asarray(parents, dtype=np.int64), children, has_list
+
+
+def _to_objects(values):
+    out = np.empty(len(values), dtype=object)
+    out[:] = values
+    return out
+
+
+def parse_number_column(values):
+    """Vectorized utils.parse_number over a column; returns an object ndarray."""
+    s = pd.Series(values, dtype=object).reset_index(drop=True)
+    out = np.full(len(s), None, dtype=object)
+    kinds = s.map(type)
+
+    passthrough = kinds.isin([int, float, bool]).to_numpy()
+    out[passthrough] = s[passthrough].to_numpy()
+
+    is_str = (kinds == str).to_numpy()
+    if not is_str.any():
+        return out
+    text = s[is_str].str.strip()
+    text = text[(text != "") & (text.str.lower() != "null")]
+    cleaned = text.str.replace(",", "", regex=False).str.replace(r"[^\d.-]", "", regex=True)
+    cleaned = cleaned[cleaned.str.fullmatch(_NUMBER_RE).astype(bool)]
+    if cleaned.empty:
+        return out
+
+    floats = cleaned.to_numpy(dtype=object).astype(np.float64)
+    positions = cleaned.index.to_numpy()
+    integral = np.isfinite(floats) & (np.mod(floats, 1.0) == 0.0)
+    small = integral & (np.abs(floats) < _INT64_LIMIT)
+    out[positions[small]] = _to_objects(floats[small].astype(np.int64).tolist())
+    big = integral & ~small
+    out[positions[big]] = _to_objects([int(f) for f in floats[big]])
+    out[positions[~integral]] = _to_objects(floats[~integral].tolist())
+    return out
+
+
+def hash_key_columns(columns):
+    """Vectorized utils.hash_key over parallel columns of key parts."""
+    parts = []
+    for col in columns:
+        s = pd.Series(col, dtype=object).reset_index(drop=True)
+        missing = (s.map(type) == type(None)).to_numpy()
+        text = s.where(~missing, "").map(str).str.strip().str.lower()
+        parts.append(text.astype(object))
+    joined = parts[0].str.cat(parts[1:], sep="|") if len(parts) > 1 else parts[0]
+    return [hashlib.sha256(k.encode("utf-8")).hexdigest() for k in joined.tolist()]
+
+
+def yes_flag(values):
+    """Vectorized str(v).strip().lower() == "yes" as a boolean ndarray."""
+    s = pd.Series(values, dtype=object)
+    return (s.map(str).str.strip().str.lower() == "yes").to_numpy(dtype=bool)
+
+
+def is_empty_value(values):
+    """Vectorized `v in (None, "", " ")` as a boolean ndarray."""
+    s = pd.Series(values, dtype=object)
+    missing = s.map(type) == type(None)
+    return (missing | (s == "") | (s == " ")).to_numpy(dtype=bool)
+
+
+def flag_score(parents, children, keys, n):
+    """
+    Per-row count of children with any of the Yes/No flags in keys set to "yes",
+    as a list of Python floats (0.0 where none).
+    """
+    hit = np.zeros(len(children), dtype=bool)
+    for k in keys:
+        hit |= yes_flag([c.get(k, "") for c in children])
+    return group_sum(parents, hit.astype(np.float64), n).tolist()
+
+
+def group_any(parents, flags, n):
+    """Per-row any() of child flags."""
+    out = np.zeros(n, dtype=bool)
+    np.logical_or.at(out, parents, flags)
+    return out
+
+
+def group_sum(parents, weights, n):
+    """Per-row sum of float child weights."""
+    return np.bincount(parents, weights=weights, minlength=n).astype(np.float64)
+
+
+def group_max(parents, values, n):
+    """
+    Per-row max() of child numbers ignoring None, as Python objects.
+    Like builtin max(), the first child holding the maximum wins, so int/float types match.
+    """
+    out = np.full(n, None, dtype=object)
+    values = np.asarray(values, dtype=object)
+    present = np.fromiter((v is not None for v in values), dtype=bool, count=len(values))
+    if not present.any():
+        return out
+    df = pd.DataFrame({
+        "parent": parents[present],
+        "value": values[present].astype(np.float64),
+        "pos": np.flatnonzero(present),
+    })
+    top = df["value"] == df.groupby("parent")["value"].transform("max")
+    first = df[top].drop_duplicates("parent")
+    out[first["parent"].to_numpy()] = _to_objects(values[first["pos"].to_numpy()].tolist())
+    return out
@@ -1,12 +1,31 @@
 import os
 import sys
 import json
+import hashlib
+import tempfile
+import threading
+import argparse
+import cProfile
+import pstats
 import yaml
+from datetime import date, datetime
+from decimal import Decimal, ROUND_HALF_UP
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+from itertools import chain, islice
+from time import perf_counter
 from dotenv import load_dotenv
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from utils import get_conn, dict_get, coerce_date, hash_key, parse_number
+import jsoncodec
+from aggregates import (read_contributions, update_property_summary, rebuild_property_summary,
+                        upsert_current_snapshots, rebuild_property_current, fold_text, CURRENT_TABLE)
+from line_index import iter_parsed_chunks
+from metrics import RunMetrics, InstrumentedConnection, write_json_report, write_prometheus_textfile
+from pipeline import Pipeline
+from utils import get_conn, dict_get, coerce_date, hash_key, parse_number, file_fingerprint, LRUCache, ConnectionPool
 
 load_dotenv()
 
@@ -14,19 +33,103 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_PATH = os.path.join(BASE_DIR, "data", "fake_property_data_new.json")
 CFG_PATH = os.path.join(BASE_DIR, "scripts", "etl_config.yaml")
 SCHEMA_SQL = os.path.join(BASE_DIR, "sql", "01_schema.sql")
+READ_BUFFER_SIZE = 1 << 16
+STAGING_TMP_DIR = tempfile.gettempdir()
+DEFAULT_PROFILE_PATH = os.path.join(BASE_DIR, "logs", "etl_transform.prof")
 
 def load_config():
     with open(CFG_PATH, "r", encoding="utf-8") as f:
         return yaml.safe_load(f) or {}
 
-def read_input_records(path):
-    """Supports JSON array or JSONL (one object per line)."""
+def _iter_json_array(f, bufsize=READ_BUFFER_SIZE, with_source=False):
+    """
+    Incrementally decode the elements of a top-level JSON array without loading the whole file.
+    With with_source, yields (byte offset, source text, decoded element) triples.
+    """
+    decoder = json.JSONDecoder()
+    buf = ""
+    # Byte offset of buf[0] in the file, and how far into buf it has been counted.
+    base = 0
+    counted = 0
+    while not buf:
+        more = f.read(bufsize)
+        if not more:
+            break
+        buf = more.lstrip()
+        base += len(more[:len(more) - len(buf)].encode("utf-8"))
+    if not buf.startswith("["):
+        raise ValueError("Expected a JSON array")
+    pos = 1
+    eof = False
+    while True:
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+        if pos < len(buf) and buf[pos] == "]":
+            return
+        if pos < len(buf):
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                # A value ending exactly at the buffer edge may be truncated (e.g. a number).
+                if end < len(buf) or eof:
+                    if with_source:
+                        base += len(buf[counted:pos].encode("utf-8"))
+                        counted = pos
+                        yield base, buf[pos:end], obj
+                    else:
+                        yield obj
+                    pos = end
+                    continue
+        elif eof:
+            raise ValueError("Unterminated JSON array")
+        more = f.read(bufsize)
+        eof = not more
+        if with_source:
+            base += len(buf[counted:pos].encode("utf-8"))
+            counted = 0
+        buf = buf[pos:] + more
+        pos = 0
+
+def is_json_array(path):
+    """True if the file holds a JSON array, False for JSONL."""
     with open(path, "r", encoding="utf-8") as f:
-        first = f.read(1); f.seek(0)
-        if first == "[":
-            return json.load(f)
-        else:
-            return [json.loads(line) for line in f if line.strip()]
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+    return first == "["
+
+def iter_input_records(path, with_source=False):
+    """
+    Stream records from a JSON array or JSONL (one object per line) file.
+    With with_source, yields (byte offset, raw JSON text, record) triples: the offset
+    addresses the record in the file (stored as the fact's source_record_id) and the
+    original text can be staged without serializing the record again.
+    """
+    if is_json_array(path):
+        with open(path, "r", encoding="utf-8") as f:
+            yield from _iter_json_array(f, with_source=with_source)
+        return
+    with open(path, "rb") as f:
+        offset = 0
+        for line in f:
+            start = offset
+            offset += len(line)
+            if line.strip():
+                raw = line.decode("utf-8").strip()
+                rec = jsoncodec.loads(raw)
+                yield (start, raw, rec) if with_source else rec
+
+def iter_chunks(iterable, size):
+    """Yield lists of at most size items."""
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
 
 def best_valuation(val_list):
     """
@@ -55,6 +158,10 @@ def best_valuation(val_list):
         "as_of_date": None,
     }
 
+# rules_json only ever holds the any_hoa flag, so both documents are encoded once, in
+# the same ", "/": " spelling MySQL uses when it returns a JSON column.
+HOA_RULES_JSON = {flag: json.dumps({"any_hoa": flag}) for flag in (False, True)}
+
 def aggregate_hoa(hoa_list):
     """Aggregate HOA data: use max fee and flag if any HOA exists."""
     if not isinstance(hoa_list, list) or not hoa_list:
@@ -62,13 +169,12 @@ def aggregate_hoa(hoa_list):
     fees = [parse_number(h.get("HOA")) for h in hoa_list if h.get("HOA") not in (None, "", " ")]
     fee = max([f for f in fees if f is not None], default=None)
     any_yes = any(str(h.get("HOA_Flag","")).strip().lower() == "yes" for h in hoa_list)
-    rules = {"any_hoa": any_yes} if any_yes is not None else None
     return {
         "hoa_name": None,
         "hoa_monthly_fee": fee,
         "hoa_phone": None,
         "hoa_email": None,
-        "rules_json": json.dumps(rules) if rules else None,
+        "rules_json": HOA_RULES_JSON[any_yes],
     }
 
 def aggregate_rehab(rehab_list):
@@ -100,93 +206,302 @@ def aggregate_rehab(rehab_list):
         "as_of_date": None
     }
 
-def run_schema(conn):
-    """Create database schema and indexes."""
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    
-    schema_file = os.path.join(base_dir, "sql", "01_schema.sql")
-    with open(schema_file, "r", encoding="utf-8") as f:
-        sql = f.read()
+SCHEMA_MIGRATION_TABLE = "etl_schema_migration"
+# MySQL errno of a missing table, and of DDL creating a table or index that already exists.
+_NO_SUCH_TABLE = 1146
+_ALREADY_EXISTS = {1050, 1061}
+
+def _sql_statements(path):
+    """Statements of a SQL file, with '--' comment lines dropped."""
+    with open(path, "r", encoding="utf-8") as f:
+        text = "\n".join(line for line in f.read().splitlines() if not line.lstrip().startswith("--"))
+    return [stmt.strip() for stmt in text.split(";") if stmt.strip()]
+
+def apply_sql_file(conn, path):
+    """Execute a schema file. Objects that already exist are skipped: databases created
+    before migrations were tracked already have the tables and indexes of the first steps."""
     cur = conn.cursor()
-    for stmt in sql.split(";"):
-        stmt = stmt.strip()
-        if stmt:
-            try:
-                cur.execute(stmt)
-            except Exception as e:
-                if "already exists" not in str(e).lower():
-                    print(f"Warning: {str(e)}")
+    for stmt in _sql_statements(path):
+        try:
+            cur.execute(stmt)
+        except Exception as e:
+            if getattr(e, "errno", None) not in _ALREADY_EXISTS:
+                raise
     cur.close()
-    
-    indexes_file = os.path.join(base_dir, "sql", "02_indexes.sql")
-    if os.path.exists(indexes_file):
-        with open(indexes_file, "r", encoding="utf-8") as f:
-            sql = f.read()
+
+def migration_steps():
+    """(version, name, checksum, apply) of every entry of MIGRATIONS, in version order."""
+    steps = []
+    for version, step in MIGRATIONS:
+        if callable(step):
+            steps.append((version, step.__name__, hash_key([step.__name__]), step))
+            continue
+        path = os.path.join(BASE_DIR, "sql", step)
+        with open(path, "rb") as f:
+            checksum = hashlib.sha256(f.read()).hexdigest()
+        steps.append((version, step, checksum, lambda conn, path=path: apply_sql_file(conn, path)))
+    return sorted(steps, key=lambda step: step[0])
+
+def applied_migrations(conn):
+    """{version: checksum} of the migrations recorded as applied, or None before the first run."""
+    cur = conn.cursor(buffered=True)
+    try:
+        cur.execute(f"SELECT version, checksum FROM {SCHEMA_MIGRATION_TABLE}")
+        return dict(cur.fetchall())
+    except Exception as e:
+        if getattr(e, "errno", None) != _NO_SUCH_TABLE:
+            raise
+        return None
+    finally:
+        cur.close()
+
+def run_schema(conn):
+    """
+    Bring the schema up to date by applying the new steps of MIGRATIONS in order, SQL
+    files before functions. Each applied step is recorded in etl_schema_migration with a
+    checksum of its definition, so a run whose steps all match issues one SELECT and no
+    DDL. An applied step whose checksum no longer matches (an edited SQL file, a renamed
+    function) raises RuntimeError naming its version instead of being replayed; schema
+    changes go in a new step. Returns True if any step ran.
+    """
+    applied = applied_migrations(conn)
+    if applied is None:
         cur = conn.cursor()
-        for stmt in sql.split(";"):
-            stmt = stmt.strip()
-            if stmt and not stmt.startswith("--"):
-                try:
-                    cur.execute(stmt)
-                except Exception as e:
-                    if "duplicate key" not in str(e).lower() and "already exists" not in str(e).lower():
-                        print(f"Warning creating index: {str(e)}")
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {SCHEMA_MIGRATION_TABLE} (
+              version INT PRIMARY KEY,
+              name VARCHAR(128) NOT NULL,
+              checksum CHAR(64) NOT NULL,
+              applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            ) ENGINE=InnoDB
+        """)
         cur.close()
+        applied = {}
+    steps = migration_steps()
+    changed = [f"{version} ({name})" for version, name, checksum, _ in steps
+               if version in applied and applied[version] != checksum]
+    if changed:
+        raise RuntimeError(f"Applied migration {', '.join(changed)} changed since it was applied; "
+                           "restore it and add a new migration step for the schema change")
+    pending = [step for step in steps if step[0] not in applied]
+    # Function steps run with the current code, which may read columns added by later
+    # SQL steps, so pending SQL steps go first (stable sort keeps version order).
+    pending.sort(key=lambda step: not step[1].endswith(".sql"))
+    if not pending:
+        print(f"  Schema is at version {max(applied)}; no DDL needed")
+        return False
+    for version, name, checksum, apply in pending:
+        print(f"  Applying migration {version}: {name}")
+        apply(conn)
+        cur = conn.cursor()
+        cur.execute(f"INSERT INTO {SCHEMA_MIGRATION_TABLE} (version, name, checksum) VALUES (%s, %s, %s)",
+                    (version, name, checksum))
+        cur.close()
+        conn.commit()
+    return True
+
+# Dimension table -> (surrogate key column, natural key columns). Order matches
+# the dimension key columns of fact_property_snapshot.
+DIMENSIONS = {
+    "dim_property": ("property_sk", ("property_bk",)),
+    "dim_address": ("address_sk", ("address_line1", "city", "state", "postal_code")),
+    "dim_hoa": ("hoa_sk", ("hoa_name", "hoa_monthly_fee")),
+    "dim_valuation": ("valuation_sk", ("provider", "as_of_date", "estimate", "estimate_low", "estimate_high")),
+    "dim_rehab": ("rehab_sk", ("as_of_date", "total_estimate", "exterior", "interior", "systems")),
+    "dim_tax": ("tax_sk", ("tax_year", "assessed_value", "tax_amount")),
+}
+
+# Dimensions deduplicated on a SHA-256 of their normalized natural key instead of a
+# wide composite unique key over nullable columns (which never dedupes NULLs).
+ROW_HASH_COLUMN = "row_hash"
+HASHED_DIMENSIONS = {
+    "dim_hoa": "uk_hoa",
+    "dim_valuation": "uk_val",
+    "dim_rehab": "uk_rehab",
+    "dim_tax": "uk_tax",
+}
+
+FACT_COLUMNS = ("property_sk", "address_sk", "hoa_sk", "valuation_sk", "rehab_sk", "tax_sk",
+                "effective_date", "source_record_id", "source_file_id")
+# Grain of fact_property_snapshot: one snapshot per property per effective date.
+FACT_KEY = ("property_sk", "effective_date")
+
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_CACHE_SIZE = 100000
+DEFAULT_QUEUE_SIZE = 4
+DEFAULT_DEDUPE = "last"
+_KEY_SCALE = Decimal("0.01")
+
+# SQL type of each natural key column; _key_param normalizes values by it.
+KEY_COLUMN_TYPES = {
+    "property_bk": "text",
+    "address_line1": "text", "city": "text", "state": "text", "postal_code": "text",
+    "hoa_name": "text", "hoa_monthly_fee": "decimal",
+    "provider": "text", "as_of_date": "date",
+    "estimate": "decimal", "estimate_low": "decimal", "estimate_high": "decimal",
+    "total_estimate": "decimal", "exterior": "decimal", "interior": "decimal", "systems": "decimal",
+    "tax_year": "int", "assessed_value": "decimal", "tax_amount": "decimal",
+}
+
+def _number(value):
+    if isinstance(value, bool):
+        return Decimal(int(value))
+    if isinstance(value, (int, float, Decimal)):
+        return Decimal(str(value))
+    return None
+
+def _key_param(value, column):
+    """
+    Normalize a natural key value to what MySQL stores for it in column: numbers are
+    rounded to the DECIMAL(x,2) scale of the decimal key columns and to whole numbers
+    for integer ones, VARCHAR values become the text MySQL would store (78701 and
+    78701.0 both as '78701') and dates ISO strings. Values that do not fit the column
+    type (unparsed text in a numeric column) are left as they are.
+    """
+    if value is None:
+        return None
+    kind = KEY_COLUMN_TYPES[column]
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()[:10]
+    number = _number(value)
+    if kind == "text":
+        if number is not None and number == number.to_integral_value():
+            return str(int(number))
+        return value if isinstance(value, str) else str(value)
+    if number is None:
+        return value
+    if kind == "int":
+        return int(number.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+    if kind == "decimal":
+        return number.quantize(_KEY_SCALE, rounding=ROUND_HALF_UP)
+    return value
+
+def _fold_key(params):
+    """
+    Match key for a natural key tuple. Strings compare case- and accent-insensitively,
+    approximating the DB collation (utf8mb4_0900_ai_ci), so rows the DB would treat as
+    one are written once. Key lookups themselves are matched by the DB.
+    """
+    return tuple(fold_text(p) if isinstance(p, str) else p for p in params)
+
+def _sig_value(value):
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float, Decimal)):
+        return Decimal(str(value)).normalize()
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()[:10]
+    return str(value)
+
+def _row_sig(row, skip=()):
+    """
+    Exact, column-order independent signature of a dimension row.
+    A cached key is only reused when the row to write matches the cached signature,
+    so skipping the write never drops an ON DUPLICATE KEY UPDATE change.
+    """
+    return tuple(sorted((c, _sig_value(v)) for c, v in row.items() if c not in skip))
+
+def natural_key(table, data):
+    """Return the normalized natural key tuple of a dimension row."""
+    _, key_cols = DIMENSIONS[table]
+    return tuple(_key_param(data.get(c), c) for c in key_cols)
+
+def row_hash(table, data):
+    """Fixed-width hash of a row's normalized and folded natural key, computed like hash_key()."""
+    return hash_key(_fold_key(natural_key(table, data)))
+
+def _with_row_hash(table, data):
+    if table not in HASHED_DIMENSIONS:
+        return data
+    return {**data, ROW_HASH_COLUMN: row_hash(table, data)}
+
+def upgrade_row_hash(conn):
+    """
+    Bring databases created before row_hash existed up to the current schema.
+    For each hashed dimension: add and backfill row_hash, merge rows that share a hash
+    (repointing facts to the lowest surrogate key), then swap the composite unique key
+    for a unique index on row_hash. No-op once the column exists.
+    """
+    cur = conn.cursor(buffered=True)
+    for table, old_key in HASHED_DIMENSIONS.items():
+        cur.execute("""
+            SELECT COUNT(*) FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+        """, (table, ROW_HASH_COLUMN))
+        if cur.fetchone()[0]:
+            continue
+        print(f"  Upgrading {table}: adding {ROW_HASH_COLUMN}")
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN {ROW_HASH_COLUMN} CHAR(64) NULL")
+        hashed, merged = _rehash_rows(cur, table, ("fact_property_snapshot",))
+        cur.execute(f"ALTER TABLE {table} MODIFY {ROW_HASH_COLUMN} CHAR(64) NOT NULL, "
+                    f"ADD UNIQUE KEY {old_key}_hash ({ROW_HASH_COLUMN}), DROP INDEX {old_key}")
+        conn.commit()
+        print(f"  {table}: {hashed} rows hashed, {merged} duplicates merged")
+    cur.close()
+
+def _rehash_rows(cur, table, referencing):
+    """
+    Recompute the row_hash of every row of a hashed dimension from its key columns.
+    Rows that now share a hash are merged into the lowest surrogate key, repointing
+    the tables in referencing first. Returns (rows whose hash changed, rows merged).
+    """
+    pk_col, key_cols = DIMENSIONS[table]
+    cur.execute(f"SELECT {pk_col}, {ROW_HASH_COLUMN}, {','.join(key_cols)} FROM {table} ORDER BY {pk_col}")
+    canonical = {}
+    changed = []
+    merged = []
+    for found in cur.fetchall():
+        h = row_hash(table, dict(zip(key_cols, found[2:])))
+        if h in canonical:
+            merged.append((canonical[h], found[0]))
+        else:
+            canonical[h] = found[0]
+            if found[1] != h:
+                changed.append((h, found[0], found[1]))
+    if merged:
+        for ref in referencing:
+            cur.executemany(f"UPDATE {ref} SET {pk_col} = %s WHERE {pk_col} = %s", merged)
+        cur.executemany(f"DELETE FROM {table} WHERE {pk_col} = %s", [(dup,) for _, dup in merged])
+    # Rows with a hash already set move to a placeholder first, so no update collides
+    # with a hash another row has not given up yet.
+    parked = [(f"~{sk}", sk) for _, sk, old in changed if old is not None]
+    if parked:
+        cur.executemany(f"UPDATE {table} SET {ROW_HASH_COLUMN} = %s WHERE {pk_col} = %s", parked)
+    cur.executemany(f"UPDATE {table} SET {ROW_HASH_COLUMN} = %s WHERE {pk_col} = %s",
+                    [(h, sk) for h, sk, _ in changed])
+    return len(changed), len(merged)
+
+def rehash_dimension_keys(conn):
+    """
+    Recompute row_hash with the per-column key normalization of _key_param() (whole
+    numbers for tax_year, text for VARCHAR key columns) and accent folding, merging rows
+    that turn out to be duplicates and lowering the running totals by the rows merged away.
+    """
+    cur = conn.cursor(buffered=True)
+    for table in HASHED_DIMENSIONS:
+        hashed, merged = _rehash_rows(cur, table, ("fact_property_snapshot", CURRENT_TABLE))
+        if merged:
+            cur.execute(f"UPDATE {TOTALS_TABLE} SET row_count = row_count - %s WHERE table_name = %s",
+                        (merged, table))
+        if hashed or merged:
+            print(f"  {table}: {hashed} rows rehashed, {merged} duplicates merged")
+    cur.close()
 
 def upsert(conn, table, data):
     """
     Insert or update record and return surrogate key.
     Uses ON DUPLICATE KEY UPDATE with lookup based on unique business keys.
     """
+    data = _with_row_hash(table, data)
     cols = list(data.keys())
     placeholders = ",".join(["%s"] * len(cols))
     updates = ",".join([f"{c}=VALUES({c})" for c in cols])
     
-    pk_col_name = None
-    lookup_cols = None
-    
-    if table == "dim_property":
-        pk_col_name = "property_sk"
-        lookup_cols = {"property_bk": data.get("property_bk")}
-    elif table == "dim_address":
-        pk_col_name = "address_sk"
-        lookup_cols = {
-            "address_line1": data.get("address_line1"),
-            "city": data.get("city"),
-            "state": data.get("state"),
-            "postal_code": data.get("postal_code")
-        }
-    elif table == "dim_hoa":
-        pk_col_name = "hoa_sk"
-        lookup_cols = {
-            "hoa_name": data.get("hoa_name"),
-            "hoa_monthly_fee": data.get("hoa_monthly_fee")
-        }
-    elif table == "dim_valuation":
-        pk_col_name = "valuation_sk"
-        lookup_cols = {
-            "provider": data.get("provider"),
-            "as_of_date": data.get("as_of_date"),
-            "estimate": data.get("estimate"),
-            "estimate_low": data.get("estimate_low"),
-            "estimate_high": data.get("estimate_high")
-        }
-    elif table == "dim_rehab":
-        pk_col_name = "rehab_sk"
-        lookup_cols = {
-            "as_of_date": data.get("as_of_date"),
-            "total_estimate": data.get("total_estimate"),
-            "exterior": data.get("exterior"),
-            "interior": data.get("interior"),
-            "systems": data.get("systems")
-        }
-    elif table == "dim_tax":
-        pk_col_name = "tax_sk"
-        lookup_cols = {
-            "tax_year": data.get("tax_year"),
-            "assessed_value": data.get("assessed_value"),
-            "tax_amount": data.get("tax_amount")
-        }
+    pk_col_name, key_cols = DIMENSIONS.get(table, (None, ()))
+    if table in HASHED_DIMENSIONS:
+        lookup_cols = {ROW_HASH_COLUMN: data[ROW_HASH_COLUMN]}
+    else:
+        lookup_cols = {c: _key_param(data.get(c), c) for c in key_cols}
     
     sql = f"INSERT INTO {table} ({','.join(cols)}) VALUES ({placeholders}) ON DUPLICATE KEY UPDATE {updates}"
     cur = conn.cursor(buffered=True)
@@ -224,109 +539,1166 @@ def upsert(conn, table, data):
     cur.close()
     return rid
 
-def main():
+def bulk_upsert(conn, table, rows, cache=None):
+    """
+    Set-based counterpart of upsert() for a chunk of dimension rows.
+    Writes all distinct rows, key columns normalized by _key_param(), with one
+    multi-row INSERT ... ON DUPLICATE KEY UPDATE, then resolves every surrogate key
+    with one lookup joining the table to the rows' keys and their positions, so the
+    DB's own comparison decides which row each key matches (on the row_hash index for
+    HASHED_DIMENSIONS). A key the lookup cannot match falls back to upsert().
+    Rows already in the optional LRUCache with an identical signature skip the DB.
+    Returns a dict mapping _fold_key(natural_key(...)) -> surrogate key.
+    """
+    pk_col, key_cols = DIMENSIONS[table]
+    distinct = {}
+    for row in rows:
+        # Later rows win, matching the row-by-row update order.
+        distinct[_fold_key(natural_key(table, row))] = row
+
+    keys = {}
+    if cache is not None:
+        for k, row in list(distinct.items()):
+            cached = cache.get(k)
+            if cached is not None and cached[1] == _row_sig(row):
+                keys[k] = cached[0]
+                del distinct[k]
+    if not distinct:
+        return keys
+
+    written = {k: _with_row_hash(table, {**row, **dict(zip(key_cols, natural_key(table, row)))})
+               for k, row in distinct.items()}
+    cols = list(next(iter(written.values())).keys())
+    row_placeholder = "(" + ",".join(["%s"] * len(cols)) + ")"
+    updates = ",".join([f"{c}=VALUES({c})" for c in cols])
+    sql = (f"INSERT INTO {table} ({','.join(cols)}) VALUES "
+           f"{','.join([row_placeholder] * len(written))} ON DUPLICATE KEY UPDATE {updates}")
+    cur = conn.cursor()
+    cur.execute(sql, [row[c] for row in written.values() for c in cols])
+    cur.close()
+
+    match_cols = (ROW_HASH_COLUMN,) if table in HASHED_DIMENSIONS else key_cols
+    order = list(written)
+    # NULL-safe equality so keys with NULL parts still resolve; the lowest key wins.
+    keyed = " UNION ALL ".join(["SELECT %s AS pos, " + ", ".join([f"%s AS {c}" for c in match_cols])]
+                               + ["SELECT %s, " + ", ".join(["%s"] * len(match_cols))] * (len(order) - 1))
+    cur = conn.cursor(buffered=True)
+    cur.execute(f"SELECT p.pos, MIN(t.{pk_col}) FROM ({keyed}) p JOIN {table} t ON "
+                + " AND ".join([f"t.{c} <=> p.{c}" for c in match_cols]) + " GROUP BY p.pos",
+                [v for i, k in enumerate(order) for v in (i, *[written[k][c] for c in match_cols])])
+    for pos, sk in cur.fetchall():
+        keys[order[int(pos)]] = sk
+    cur.close()
+
+    missing = [k for k in distinct if k not in keys]
+    if missing:
+        print(f"  {table}: {len(missing)} keys not matched by the bulk lookup, upserting them one by one")
+        for k in missing:
+            keys[k] = upsert(conn, table, distinct[k])
+    if cache is not None:
+        for k, row in distinct.items():
+            cache.put(k, (keys[k], _row_sig(row)))
+    return keys
+
+def warm_key_caches(conn, caches):
+    """
+    Preload each dimension cache with its most recent rows, newest last so they
+    are evicted last. Returns the number of entries loaded.
+    """
+    loaded = 0
+    for table, cache in caches.items():
+        if cache.maxsize <= 0:
+            continue
+        pk_col, key_cols = DIMENSIONS[table]
+        cur = conn.cursor(dictionary=True, buffered=True)
+        cur.execute(f"SELECT * FROM {table} ORDER BY {pk_col} DESC LIMIT %s", (cache.maxsize,))
+        for row in reversed(cur.fetchall()):
+            k = _fold_key(natural_key(table, row))
+            if k not in cache:
+                cache.put(k, (row[pk_col], _row_sig(row, skip=(pk_col, "created_at", ROW_HASH_COLUMN))))
+                loaded += 1
+        cur.close()
+    return loaded
+
+# Mapped target columns cleaned with parse_number; other mapped columns are copied as-is.
+NUMERIC_COLUMNS = {
+    "property": {"square_feet", "bedrooms", "bathrooms", "lot_size_sqft"},
+    "address": {"latitude", "longitude"},
+    "tax": {"tax_year", "assessed_value", "tax_amount"},
+}
+# etl_config.yaml mapping section -> dimension table built from it.
+MAPPED_TABLES = {"property": "dim_property", "address": "dim_address", "tax": "dim_tax"}
+_EMPTY = (None, "", " ")
+
+def compile_transform_plan(cfg):
+    """
+    Compile the keys, mappings and defaults of etl_config.yaml once per run.
+    For each mapped dimension the plan holds a row template (every target column in
+    config order, pre-filled with its default) and a tuple of (column, source field,
+    coercer) steps for the columns that are actually mapped; empty mappings never
+    reach the per-record loop. The plan is plain data so it pickles to worker processes.
+    """
+    keys = cfg.get("keys") or {}
+    mappings = cfg.get("mappings") or {}
+    defaults = cfg.get("defaults") or {}
+    plan = {
+        "business_key": keys.get("business_key") or None,
+        "bk_fields": tuple(keys.get("bk_fallback") or ()),
+    }
+    if not plan["business_key"] and not plan["bk_fields"]:
+        raise ValueError("etl_config.yaml: set keys.business_key or keys.bk_fallback")
+    for section, table in MAPPED_TABLES.items():
+        template = {"property_bk": None} if table == "dim_property" else {}
+        steps = []
+        for col, src in (mappings.get(section) or {}).items():
+            template[col] = defaults.get(col)
+            if src:
+                coerce = parse_number if col in NUMERIC_COLUMNS.get(section, ()) else None
+                steps.append((col, src, coerce))
+        plan[table] = (template, tuple(steps))
+    return plan
+
+def _apply_steps(rec, template, steps):
+    row = dict(template)
+    for col, src, coerce in steps:
+        value = rec.get(src)
+        row[col] = coerce(value) if coerce else value
+    return row
+
+def business_key(rec, plan):
+    """property_bk: hash of keys.business_key when present, else of the keys.bk_fallback fields."""
+    bk_field = plan["business_key"]
+    if bk_field and rec.get(bk_field) not in _EMPTY:
+        return hash_key([rec.get(bk_field)])
+    return hash_key([rec.get(f) for f in plan["bk_fields"]])
+
+def _finish_rows(prop, addr, hoa, val, reh, tax):
+    eff_date = (val or {}).get("as_of_date") or (reh or {}).get("as_of_date") or "1970-01-01"
+    return {
+        "dim_property": prop,
+        "dim_address": addr,
+        "dim_hoa": hoa if (hoa and any(v is not None for v in hoa.values())) else None,
+        "dim_valuation": val if (val and any(v is not None for v in val.values())) else None,
+        "dim_rehab": reh if (reh and any(v is not None for v in reh.values())) else None,
+        "dim_tax": tax if (tax and any(v is not None for v in tax.values())) else None,
+        "effective_date": eff_date,
+    }
+
+def transform_record(rec, plan):
+    """Transform one source record into its dimension rows and fact attributes."""
+    prop = _apply_steps(rec, *plan["dim_property"])
+    prop["property_bk"] = business_key(rec, plan)
+    addr = _apply_steps(rec, *plan["dim_address"])
+
+    hoa = aggregate_hoa(rec.get("HOA"))
+    val = best_valuation(rec.get("Valuation"))
+    reh = aggregate_rehab(rec.get("Rehab"))
+
+    tax = None
+    tax_template, tax_steps = plan["dim_tax"]
+    if any(rec.get(src) not in _EMPTY for _, src, _ in tax_steps):
+        tax = _apply_steps(rec, tax_template, tax_steps)
+
+    return _finish_rows(prop, addr, hoa, val, reh, tax)
+
+def _plan_columns(col, chunk, steps):
+    """Evaluate the mapped steps of a plan entry column-wise."""
+    columns = {}
+    for name, src, coerce in steps:
+        values = col.object_column(chunk, src)
+        columns[name] = col.parse_number_column(values) if coerce else values.tolist()
+    return columns
+
+def _rows_from_columns(template, columns, i):
+    row = dict(template)
+    for name, values in columns.items():
+        row[name] = values[i]
+    return row
+
+def transform_chunk_columnar(chunk, plan):
+    """
+    Columnar counterpart of transform_record() over a whole chunk. Numeric cleaning,
+    property_bk hashing and the HOA/rehab Yes/No flag scoring run as pandas/NumPy
+    column operations; valuation selection stays scalar. Produces the same rows.
+    """
+    if not chunk:
+        # Every record of the chunk was unchanged; empty columns have no dtype to combine.
+        return []
+    import columnar as col
+
+    n = len(chunk)
+    bks = col.hash_key_columns([col.object_column(chunk, f) for f in plan["bk_fields"]])
+    if plan["business_key"]:
+        raw_bk = col.object_column(chunk, plan["business_key"])
+        use_bk = ~col.is_empty_value(raw_bk)
+        bk_hashes = col.hash_key_columns([raw_bk])
+        bks = [h if use else fb for h, fb, use in zip(bk_hashes, bks, use_bk)]
+    prop_template, prop_steps = plan["dim_property"]
+    addr_template, addr_steps = plan["dim_address"]
+    tax_template, tax_steps = plan["dim_tax"]
+    prop_cols = _plan_columns(col, chunk, prop_steps)
+    addr_cols = _plan_columns(col, chunk, addr_steps)
+    tax_cols = _plan_columns(col, chunk, tax_steps)
+    has_tax = [False] * n
+    for _, src, _ in tax_steps:
+        has_tax = ~col.is_empty_value(col.object_column(chunk, src)) | has_tax
+
+    parents, hoas, has_hoa = col.explode_lists([rec.get("HOA") for rec in chunk])
+    hoa_fee = col.group_max(parents, col.parse_number_column([h.get("HOA") for h in hoas]), n)
+    hoa_yes = col.group_any(parents, col.yes_flag([h.get("HOA_Flag", "") for h in hoas]), n)
+
+    parents, rehabs, has_rehab = col.explode_lists([rec.get("Rehab") for rec in chunk])
+    calc = [r.get("Rehab_Calculation") for r in rehabs]
+    fallback = col.is_empty_value(calc)
+    chosen = [r.get("Underwriting_Rehab") if fb else c for r, c, fb in zip(rehabs, calc, fallback)]
+    rehab_total = col.group_max(parents, col.parse_number_column(chosen), n)
+    exterior = col.flag_score(parents, rehabs, ("Roof_Flag", "Windows_Flag"), n)
+    interior = col.flag_score(parents, rehabs, ("Kitchen_Flag", "Bathroom_Flag", "Paint"), n)
+    systems = col.flag_score(parents, rehabs, ("HVAC_Flag", "Foundation_Flag"), n)
+
+    rows = []
+    for i, rec in enumerate(chunk):
+        prop = _rows_from_columns(prop_template, prop_cols, i)
+        prop["property_bk"] = bks[i]
+        addr = _rows_from_columns(addr_template, addr_cols, i)
+        hoa = None
+        if has_hoa[i]:
+            hoa = {
+                "hoa_name": None,
+                "hoa_monthly_fee": hoa_fee[i],
+                "hoa_phone": None,
+                "hoa_email": None,
+                "rules_json": HOA_RULES_JSON[bool(hoa_yes[i])],
+            }
+        reh = None
+        if has_rehab[i]:
+            reh = {
+                "total_estimate": rehab_total[i],
+                "exterior": exterior[i] if exterior[i] else None,
+                "interior": interior[i] if interior[i] else None,
+                "systems": systems[i] if systems[i] else None,
+                "as_of_date": None,
+            }
+        val = best_valuation(rec.get("Valuation"))
+        tax = _rows_from_columns(tax_template, tax_cols, i) if has_tax[i] else None
+        rows.append(_finish_rows(prop, addr, hoa, val, reh, tax))
+    return rows
+
+TRANSFORM_ENGINES = {
+    "scalar": lambda chunk, plan: [transform_record(rec, plan) for rec in chunk],
+    "columnar": transform_chunk_columnar,
+}
+
+def transform_chunk(chunk, plan, engine="scalar"):
+    """Transform a list of source records; module-level so it can run in a worker process."""
+    return TRANSFORM_ENGINES[engine](chunk, plan)
+
+def check_engine_parity(chunk, plan):
+    """
+    Compare the columnar engine against the scalar one on a chunk.
+    Returns the indexes of records whose rows differ in any value or type.
+    """
+    scalar = transform_chunk(chunk, plan, "scalar")
+    columnar = transform_chunk(chunk, plan, "columnar")
+    return [i for i, (a, b) in enumerate(zip(scalar, columnar)) if repr(a) != repr(b)]
+
+def _untimed(stage):
+    return nullcontext()
+
+def iter_transformed(batches, plan, workers=1, engine="scalar", metrics=None, profiler=None):
+    """
+    Transform the "todo" records of each batch into batch["rows"], yielding batches in input order.
+    With workers > 1 batches are sharded across a process pool; at most two batches
+    per worker are in flight so memory stays bounded by the chunk size.
+    Time spent transforming (or waiting on workers) is charged to metrics' "transform"
+    stage; a cProfile profiler, if given, profiles in-process (workers=1) transforms.
+    """
+    timed = metrics.stage if metrics else _untimed
+    if workers <= 1:
+        run = profiler.runcall if profiler else (lambda fn, *a: fn(*a))
+        for batch in batches:
+            with timed("transform"):
+                batch["rows"] = run(transform_chunk, batch["todo"], plan, engine)
+            yield batch
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for batch in batches:
+            with timed("transform"):
+                pending.append((batch, pool.submit(transform_chunk, batch["todo"], plan, engine)))
+            if len(pending) >= workers * 2:
+                done, future = pending.popleft()
+                with timed("transform"):
+                    done["rows"] = future.result()
+                yield done
+        while pending:
+            done, future = pending.popleft()
+            with timed("transform"):
+                done["rows"] = future.result()
+            yield done
+
+def new_batch(chunk, todo=None, fingerprints=()):
+    """
+    Unit of work passed between stages, built from a chunk of (offset, raw text, record)
+    triples: the records, their raw text for staging, and the records to transform with
+    their source offsets.
+    """
+    records = [rec for _, _, rec in chunk]
+    if todo is None:
+        todo = [(offset, rec) for offset, _, rec in chunk]
+    return {
+        "records": records,
+        "raw": [raw for _, raw, _ in chunk],
+        "todo": [rec for _, rec in todo],
+        "todo_ids": [offset for offset, _ in todo],
+        "fingerprints": list(fingerprints),
+    }
+
+def config_digest(cfg):
+    """Hash of the config sections that shape transformed rows; part of every content fingerprint."""
+    return hash_key([json.dumps({k: cfg.get(k) for k in ("keys", "mappings", "defaults")}, sort_keys=True)])
+
+def content_hash(rec, salt):
+    """Fingerprint of a source record's full content under a given config digest."""
+    body = jsoncodec.dumps(rec, sort_keys=True, default=str)
+    return hashlib.sha256((salt + body).encode("utf-8")).hexdigest()
+
+FINGERPRINT_COLUMNS = ("property_bk", "content_hash", "source_key", "source_offset")
+
+class ChangeDetector:
+    """
+    Classifies the properties of a chunk as new, changed or unchanged against the
+    content fingerprints stored per property_bk in etl_record_fingerprint, with one
+    lookup per chunk. A property's fingerprint is that of the copy the load keeps
+    (loaded_fingerprint()), so feeds that repeat a property settle once it is loaded.
+    Copies in different chunks settle too: the stored fingerprint carries the
+    source_key of the input (and config) it was loaded from and the offset of its
+    copy, and an earlier copy from the same source is unchanged, since the later one
+    is compared in its own chunk. Unchanged properties are left out of the batch's
+    "todo" list (unless full_refresh) so they skip transform and load; otherwise
+    every copy goes on.
+    Fingerprints handed to the loader are remembered until release() reports them
+    visible to the detector's reads, since chunks are classified ahead of the load
+    (--pipeline, --workers); without that a property repeated in a later chunk would
+    be compared with the value from before the run. When given its own connection,
+    the read snapshot is refreshed after every lookup so fingerprints committed by the
+    loader become visible. Without a connection (the offline file sink) every record is new.
+    """
+    def __init__(self, conn, plan, salt, full_refresh=False, own_connection=False, dedupe=DEFAULT_DEDUPE,
+                 source_key=None):
+        self.conn = conn
+        self.plan = plan
+        self.salt = salt
+        self.source_key = source_key
+        self.full_refresh = full_refresh
+        self.own_connection = own_connection
+        self.dedupe = dedupe
+        self.counts = {"new": 0, "changed": 0, "unchanged": 0}
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def batches(self, chunks):
+        for chunk in chunks:
+            yield self.classify(chunk)
+
+    def classify(self, chunk):
+        copies = {}
+        for offset, _, rec in chunk:
+            copies.setdefault(business_key(rec, self.plan), []).append((offset, rec))
+        loaded = {bk: self.loaded_fingerprint([rec for _, rec in recs]) for bk, recs in copies.items()}
+        # Taken before the lookup: a fingerprint released in between is then read from the DB.
+        with self._lock:
+            pending = {bk: self._pending[bk] for bk in copies if bk in self._pending}
+        stored = {**(self._stored(list(copies)) if self.conn is not None else {}), **pending}
+
+        todo = []
+        fingerprints = []
+        for bk, recs in copies.items():
+            old, h, last = stored.get(bk), loaded[bk], recs[-1][0]
+            if old is None:
+                status = "new"
+            elif old[0] == h or (self.source_key is not None and old[1] == self.source_key and old[2] > last):
+                status = "unchanged"
+            else:
+                status = "changed"
+            self.counts[status] += len(recs)
+            if status != "unchanged" or self.full_refresh:
+                todo.extend(recs)
+                fingerprints.append((bk, h, self.source_key, last))
+        todo.sort(key=lambda item: item[0])
+        if self.conn is not None:
+            with self._lock:
+                self._pending.update((fp[0], fp[1:]) for fp in fingerprints)
+        return new_batch(chunk, todo, fingerprints)
+
+    def loaded_fingerprint(self, recs):
+        """
+        Fingerprint of a property's copies in a chunk (in input order): the content hash
+        of the copy dedupe_rows() keeps, or a hash over the kept copies' hashes when
+        several snapshots are loaded. Repeated properties are transformed here once more
+        to apply the rule.
+        """
+        hashes = [content_hash(rec, self.salt) for rec in recs]
+        if len(recs) > 1:
+            rows = [transform_record(rec, self.plan) for rec in recs]
+            _, hashes, _ = dedupe_rows(rows, hashes, self.dedupe)
+        return hashes[0] if len(hashes) == 1 else hash_key(hashes)
+
+    def release(self, fingerprints):
+        """Forget fingerprints the detector's own reads now see (saved, or committed for its own connection)."""
+        with self._lock:
+            for bk, *stored in fingerprints:
+                if self._pending.get(bk) == tuple(stored):
+                    del self._pending[bk]
+
+    def _stored(self, bks):
+        cur = self.conn.cursor(buffered=True)
+        cur.execute(f"SELECT {','.join(FINGERPRINT_COLUMNS)} FROM etl_record_fingerprint "
+                    f"WHERE property_bk IN ({','.join(['%s'] * len(bks))})", bks)
+        stored = {bk: tuple(found) for bk, *found in cur.fetchall()}
+        cur.close()
+        if self.own_connection:
+            self.conn.commit()
+        return stored
+
+def save_fingerprints(conn, fingerprints):
+    """Upsert the content fingerprints (FINGERPRINT_COLUMNS tuples) of loaded records in the chunk's transaction."""
+    if not fingerprints:
+        return
+    latest = {fp[0]: fp for fp in fingerprints}
+    updates = ",".join([f"{c}=VALUES({c})" for c in FINGERPRINT_COLUMNS[1:]])
+    cur = conn.cursor()
+    cur.execute(f"INSERT INTO etl_record_fingerprint ({','.join(FINGERPRINT_COLUMNS)}) VALUES "
+                + ",".join(["(" + ",".join(["%s"] * len(FINGERPRINT_COLUMNS)) + ")"] * len(latest))
+                + f" ON DUPLICATE KEY UPDATE {updates}",
+                [v for fp in latest.values() for v in fp])
+    cur.close()
+
+def load_source_key(file_id, salt, dedupe):
+    """Identity of what a run loads from an input: the file (checkpoint_id()), config digest and dedupe rule."""
+    return hash_key([file_id, salt, dedupe])
+
+TOTALS_TABLE = "etl_table_totals"
+WATERMARK_TABLE = "etl_validation_watermark"
+# Tables whose running row counts are kept in etl_table_totals -> their id column.
+COUNTED_TABLES = {
+    "stg_properties_raw": "stg_id",
+    **{table: pk_col for table, (pk_col, _) in DIMENSIONS.items()},
+    "fact_property_snapshot": "snapshot_id",
+}
+
+def update_table_totals(conn, tables):
+    """
+    Add the rows appended to each table since its recorded max_id to its running count
+    in etl_table_totals, with one counting query over the new id range. Called in the
+    transaction that wrote the rows, so totals commit atomically with them. Relies on
+    ids only growing, which holds while the ETL is the tables' single writer; the first
+    call on a table counts all of its rows.
+    """
+    cur = conn.cursor(buffered=True)
+    cur.execute(" UNION ALL ".join(
+        f"SELECT '{table}', COUNT(*), MAX({COUNTED_TABLES[table]}) FROM {table} "
+        f"WHERE {COUNTED_TABLES[table]} > COALESCE((SELECT max_id FROM {TOTALS_TABLE} WHERE table_name = '{table}'), 0)"
+        for table in tables))
+    deltas = [row for row in cur.fetchall() if row[1]]
+    if deltas:
+        cur.execute(f"INSERT INTO {TOTALS_TABLE} (table_name, row_count, max_id) VALUES "
+                    + ",".join(["(%s,%s,%s)"] * len(deltas))
+                    + " ON DUPLICATE KEY UPDATE row_count = row_count + VALUES(row_count), max_id = VALUES(max_id)",
+                    [v for row in deltas for v in row])
+    cur.close()
+
+def reset_staging(conn):
+    """
+    Empty stg_properties_raw. Its ids may restart from 1, so its running total and
+    validation watermark start over too; committed at once, as TRUNCATE commits anyway.
+    """
+    cur = conn.cursor()
+    cur.execute("TRUNCATE TABLE stg_properties_raw")
+    for table in (TOTALS_TABLE, WATERMARK_TABLE):
+        cur.execute(f"DELETE FROM {table} WHERE table_name = 'stg_properties_raw'")
+    cur.close()
+    conn.commit()
+
+def timed_upsert(conn, table, rows, cache=None, metrics=None):
+    """bulk_upsert() recording its latency in metrics' upsert histogram for the table."""
+    t0 = perf_counter()
+    keys = bulk_upsert(conn, table, rows, cache)
+    if metrics and rows:
+        metrics.observe_upsert(table, perf_counter() - t0)
+    return keys
+
+# Dimensions without foreign keys between them (or to dim_property); the parallel
+# loader upserts each on its own pooled connection.
+PARALLEL_DIMENSIONS = ("dim_address", "dim_hoa", "dim_valuation", "dim_rehab", "dim_tax")
+
+class ParallelDimensionLoader:
+    """
+    Upserts the PARALLEL_DIMENSIONS of a chunk concurrently, each on a connection
+    borrowed from a ConnectionPool, while dim_property is upserted on the caller's
+    connection. Each worker commits its rows, and their running total, before returning
+    the keys: the fact rows written afterwards on the caller's connection reference them
+    through foreign keys.
+    Dimension rows are therefore committed per chunk even when facts are not; they are
+    idempotent upserts, so a failed run leaves nothing a rerun would duplicate.
+    """
+    def __init__(self, pool, metrics=None):
+        self.pool = pool
+        self.metrics = metrics
+        self._executor = ThreadPoolExecutor(max_workers=len(PARALLEL_DIMENSIONS), thread_name_prefix="etl-dim")
+
+    def _upsert(self, table, rows, cache):
+        stage = self.metrics.stage("load", timed=False) if self.metrics else nullcontext()
+        with stage, self.pool.connection() as conn:
+            keys = timed_upsert(conn, table, rows, cache, self.metrics)
+            update_table_totals(conn, [table])
+            conn.commit()
+        return keys
+
+    def upsert_dimensions(self, conn, rows, caches):
+        """Surrogate keys of every dimension, as load_chunk() resolves them serially."""
+        futures = {table: self._executor.submit(self._upsert, table, [r[table] for r in rows if r[table]],
+                                                caches.get(table))
+                   for table in PARALLEL_DIMENSIONS}
+        keys = {table: timed_upsert(conn, table, [r[table] for r in rows if r[table]], caches.get(table), self.metrics)
+                for table in DIMENSIONS if table not in futures}
+        # Wait for every worker even if one fails, so none is left writing.
+        errors = []
+        for table, future in futures.items():
+            try:
+                keys[table] = future.result()
+            except Exception as e:
+                errors.append(e)
+        if errors:
+            raise errors[0]
+        return keys
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+def _completeness(row):
+    """Number of non-NULL attributes across a transformed record's dimension rows."""
+    return sum(v is not None for table in DIMENSIONS if row[table] for v in row[table].values())
+
+# In-chunk duplicate resolution: rule(new, kept) is true when a later copy replaces the kept one.
+DEDUPE_RULES = {
+    "last": lambda new, kept: True,
+    "complete": lambda new, kept: _completeness(new) >= _completeness(kept),
+}
+
+def dedupe_rows(rows, source_ids, rule=DEFAULT_DEDUPE):
+    """
+    Collapse copies of the same snapshot (property_bk, effective_date) within a chunk
+    to one record chosen by DEDUPE_RULES[rule] ("off" keeps every copy), so relisted
+    properties cost one set of dimension and fact rows. Kept records stay in input
+    order. Returns (rows, source_ids, number of copies dropped).
+    """
+    if rule == "off":
+        return rows, source_ids, 0
+    replaces = DEDUPE_RULES[rule]
+    kept = {}
+    for i, r in enumerate(rows):
+        key = (r["dim_property"]["property_bk"], r["effective_date"])
+        j = kept.get(key)
+        if j is None or replaces(r, rows[j]):
+            kept[key] = i
+    if len(kept) == len(rows):
+        return rows, source_ids, 0
+    order = sorted(kept.values())
+    return [rows[i] for i in order], [source_ids[i] for i in order], len(rows) - len(order)
+
+def load_chunk(conn, rows, caches=None, source_ids=None, metrics=None, loader=None, file_id=None):
+    """
+    Load a chunk of transformed records: one bulk upsert per dimension (concurrently
+    through a ParallelDimensionLoader, if given), then a single multi-row insert of the
+    fact rows once all their keys are resolved, and a bulk upsert of the same records
+    into fact_property_current. source_ids (parallel to rows) become the facts'
+    source_record_id and file_id (the input's checkpoint_id()) their source_file_id.
+    Each upsert's latency goes into metrics.
+    """
+    caches = caches or {}
+    if loader:
+        keys = loader.upsert_dimensions(conn, rows, caches)
+    else:
+        keys = {table: timed_upsert(conn, table, [r[table] for r in rows if r[table]], caches.get(table), metrics)
+                for table in DIMENSIONS}
+
+    facts = []
+    for r, source_id in zip(rows, source_ids or [None] * len(rows)):
+        sks = [keys[table][_fold_key(natural_key(table, r[table]))] if r[table] else None
+               for table in DIMENSIONS]
+        facts.append((*sks, r["effective_date"], source_id, file_id))
+    t0 = perf_counter()
+    load_facts(conn, facts)
+    if metrics and facts:
+        metrics.observe_upsert("fact_property_snapshot", perf_counter() - t0)
+    t0 = perf_counter()
+    upsert_current_snapshots(conn, rows, facts)
+    if metrics and facts:
+        metrics.observe_upsert("fact_property_current", perf_counter() - t0)
+
+def load_facts(conn, facts):
+    """
+    Merge fact rows on their natural key (property_sk, effective_date) with one
+    multi-row INSERT ... ON DUPLICATE KEY UPDATE, so reruns update snapshots in place.
+    """
+    if not facts:
+        return
+    updates = ",".join([f"{c}=VALUES({c})" for c in FACT_COLUMNS if c not in FACT_KEY])
+    cur = conn.cursor()
+    cur.execute(f"INSERT INTO fact_property_snapshot ({','.join(FACT_COLUMNS)}) VALUES "
+                + ",".join(["(" + ",".join(["%s"] * len(FACT_COLUMNS)) + ")"] * len(facts))
+                + f" ON DUPLICATE KEY UPDATE {updates}",
+                [v for fact in facts for v in fact])
+    cur.close()
+
+def upgrade_fact_key(conn):
+    """
+    Add the uk_fact_snapshot natural key to databases created before it existed:
+    keep the newest snapshot per (property_sk, effective_date), add the unique key and
+    drop ix_fact_prop, which it makes redundant. No-op once the key exists.
+    """
+    cur = conn.cursor(buffered=True)
+    cur.execute("""
+        SELECT COUNT(*) FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'fact_property_snapshot' AND INDEX_NAME = %s
+    """, ("uk_fact_snapshot",))
+    if not cur.fetchone()[0]:
+        print("  Upgrading fact_property_snapshot: adding natural key uk_fact_snapshot")
+        cur.execute("""
+            DELETE f FROM fact_property_snapshot f
+            JOIN (SELECT property_sk, effective_date, MAX(snapshot_id) AS keep_id
+                  FROM fact_property_snapshot
+                  GROUP BY property_sk, effective_date
+                  HAVING COUNT(*) > 1) d
+              ON d.property_sk = f.property_sk AND d.effective_date = f.effective_date
+            WHERE f.snapshot_id < d.keep_id
+        """)
+        print(f"  Removed {cur.rowcount} duplicate fact rows")
+        cur.execute("ALTER TABLE fact_property_snapshot "
+                    "ADD UNIQUE KEY uk_fact_snapshot (property_sk, effective_date)")
+        conn.commit()
+    cur.execute("""
+        SELECT COUNT(*) FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'fact_property_snapshot' AND INDEX_NAME = %s
+    """, ("ix_fact_prop",))
+    if cur.fetchone()[0]:
+        cur.execute("DROP INDEX ix_fact_prop ON fact_property_snapshot")
+    cur.close()
+
+# Ordered schema migrations: (version, step). A step is a file under sql/ or a function
+# taking the connection. Applied steps are immutable: run_schema() stops if an applied
+# file's checksum changes, so a schema change needs a new step with the next version.
+# Never renumber or remove applied ones.
+MIGRATIONS = (
+    (1, "01_schema.sql"),
+    (2, "02_indexes.sql"),
+    (3, upgrade_row_hash),
+    (4, upgrade_fact_key),
+    (5, "03_validation_summary.sql"),
+    (6, "04_property_summary.sql"),
+    (7, rebuild_property_summary),
+    (8, "05_property_current.sql"),
+    (9, rebuild_property_current),
+    (10, rehash_dimension_keys),
+    (11, "06_fingerprint_source.sql"),
+    (12, "07_source_file.sql"),
+    (13, "08_fact_updated_at.sql"),
+)
+
+_TSV_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r", "\0": "\\0"})
+# Errors meaning LOAD DATA LOCAL is disabled on the server or refused by the client.
+_LOCAL_INFILE_DISABLED = {1148, 2068, 3948, 3950}
+
+class RawStager:
+    """
+    Appends the raw JSON text of each chunk to stg_properties_raw without re-serializing it.
+    Uses LOAD DATA LOCAL INFILE from a temp file; if local infile is disabled it falls
+    back (once, for the rest of the run) to one multi-row INSERT per chunk.
+    """
+    def __init__(self, conn, use_infile=True):
+        self.conn = conn
+        self.use_infile = use_infile
+
+    def stage(self, raw):
+        if not raw:
+            return
+        if self.use_infile:
+            try:
+                self._load_infile(raw)
+                return
+            except Exception as e:
+                if getattr(e, "errno", None) not in _LOCAL_INFILE_DISABLED:
+                    raise
+                print(f"  LOAD DATA LOCAL INFILE unavailable ({e}); staging with multi-row INSERTs")
+                self.use_infile = False
+        cur = self.conn.cursor()
+        cur.execute("INSERT INTO stg_properties_raw (raw_json) VALUES " + ",".join(["(%s)"] * len(raw)), raw)
+        cur.close()
+
+    def _load_infile(self, raw):
+        fd, path = tempfile.mkstemp(prefix="stg_", suffix=".tsv", dir=STAGING_TMP_DIR)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8", newline="\n") as f:
+                for text in raw:
+                    f.write(text.translate(_TSV_ESCAPES))
+                    f.write("\n")
+            cur = self.conn.cursor()
+            cur.execute("LOAD DATA LOCAL INFILE %s INTO TABLE stg_properties_raw CHARACTER SET utf8mb4 "
+                        "FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' (raw_json)",
+                        (path,))
+            cur.close()
+        finally:
+            os.remove(path)
+
+SINK_MANIFEST = "manifest.json"
+# Files written by FileSink, in the foreign key order import_sink.py loads them in.
+SINK_TABLES = (*DIMENSIONS, "fact_property_snapshot", "etl_record_fingerprint")
+
+def _tsv_field(value):
+    """One LOAD DATA field: NULL as \\N, dates as ISO strings, text escaped like RawStager."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, str):
+        return value.translate(_TSV_ESCAPES)
+    if isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()[:10]
+    return str(value)
+
+class FileSink:
+    """
+    Offline load target (--sink DIR): writes one TSV file per table of SINK_TABLES,
+    ready for LOAD DATA, instead of loading the database. Surrogate keys are assigned
+    locally, counting from 1 in each dimension, with rows deduplicated on the natural
+    key like bulk_upsert(). A dimension row is written again under the same key when
+    its attributes change, and a fact again when its snapshot repeats; the import
+    keeps the last line of each. The manifest listing every file's columns and row
+    count is written last, so an interrupted run leaves nothing importable.
+    """
+    def __init__(self, directory, file_id=None):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.file_id = file_id
+        manifest = os.path.join(directory, SINK_MANIFEST)
+        if os.path.exists(manifest):
+            os.remove(manifest)
+        # natural key -> (local surrogate key, hash of the row last written for it)
+        self.keys = {table: {} for table in DIMENSIONS}
+        self.columns = {
+            **{table: None for table in DIMENSIONS},
+            "fact_property_snapshot": FACT_COLUMNS,
+            "etl_record_fingerprint": FINGERPRINT_COLUMNS,
+        }
+        self.rows = {table: 0 for table in SINK_TABLES}
+        self._files = {table: open(os.path.join(directory, f"{table}.tsv"), "w", encoding="utf-8", newline="\n")
+                       for table in SINK_TABLES}
+
+    def _write(self, table, values):
+        self._files[table].write("\t".join([_tsv_field(v) for v in values]) + "\n")
+        self.rows[table] += 1
+
+    def _key(self, table, row):
+        keys = self.keys[table]
+        k = _fold_key(natural_key(table, row))
+        sig = hash(_row_sig(row))
+        found = keys.get(k)
+        if found is not None and found[1] == sig:
+            return found[0]
+        sk = found[0] if found else len(keys) + 1
+        keys[k] = (sk, sig)
+        data = _with_row_hash(table, row)
+        if self.columns[table] is None:
+            self.columns[table] = (DIMENSIONS[table][0], *data)
+        self._write(table, [sk] + [data.get(c) for c in self.columns[table][1:]])
+        return sk
+
+    def write_chunk(self, rows, source_ids, fingerprints):
+        """Write a chunk of transformed records and the fingerprints of its source records."""
+        for r, source_id in zip(rows, source_ids):
+            sks = [self._key(table, r[table]) if r[table] else None for table in DIMENSIONS]
+            self._write("fact_property_snapshot", (*sks, r["effective_date"], source_id, self.file_id))
+        for fingerprint in fingerprints:
+            self._write("etl_record_fingerprint", fingerprint)
+
+    def close(self, info=None):
+        """Close the files and write the manifest; returns it."""
+        for f in self._files.values():
+            f.close()
+        manifest = {
+            **(info or {}),
+            "tables": [{"table": table, "file": f"{table}.tsv", "columns": list(self.columns[table] or ()),
+                        "rows": self.rows[table]} for table in SINK_TABLES],
+        }
+        path = os.path.join(self.directory, SINK_MANIFEST)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, default=str)
+        os.replace(path + ".tmp", path)
+        return manifest
+
+def write_sink(sink, chunks, plan, salt, workers, engine, dedupe, metrics, pipelined=False, queue_size=DEFAULT_QUEUE_SIZE,
+               source_key=None):
+    """
+    The load loop of an offline run: transform every record and write it to sink.
+    Returns (records read, duplicate copies dropped).
+    """
+    detector = ChangeDetector(None, plan, salt, dedupe=dedupe, source_key=source_key)
+    batches = metrics.timed("detect", detector.batches(chunks))
+    pipeline = None
+    if pipelined:
+        pipeline = Pipeline(batches, lambda items: iter_transformed(items, plan, workers, engine, metrics), queue_size)
+        transformed = pipeline
+    else:
+        transformed = iter_transformed(batches, plan, workers, engine, metrics)
+    processed = duplicates = 0
+    try:
+        for batch in transformed:
+            for stage in ("read", "detect"):
+                metrics.add_rows(stage, len(batch["records"]))
+            metrics.add_rows("transform", len(batch["todo"]))
+            with metrics.stage("load"):
+                rows, source_ids, dropped = dedupe_rows(batch["rows"], batch["todo_ids"], dedupe)
+                duplicates += dropped
+                sink.write_chunk(rows, source_ids, batch["fingerprints"])
+            metrics.add_rows("load", len(rows))
+            processed += len(batch["records"])
+            print(f"  Processed {processed} records...")
+    finally:
+        if pipeline:
+            pipeline.close()
+    return processed, duplicates
+
+def checkpoint_id(fingerprint):
+    """Checkpoint row key for an input file identity (path, size, content hash)."""
+    return hash_key([fingerprint["source_path"], fingerprint["source_size"], fingerprint["source_sha256"]])
+
+def read_checkpoint(conn, file_id):
+    """Return (records, chunks) already committed by an unfinished run of this file."""
+    cur = conn.cursor(dictionary=True, buffered=True)
+    cur.execute("SELECT records_committed, chunks_committed, status FROM etl_checkpoint WHERE file_id = %s",
+                (file_id,))
+    row = cur.fetchone()
+    cur.close()
+    if row and row["status"] == "running":
+        return int(row["records_committed"]), int(row["chunks_committed"])
+    return 0, 0
+
+def save_checkpoint(conn, file_id, fingerprint, records, chunks, status="running"):
+    """
+    Record progress for an input file. Called inside the chunk's transaction,
+    so the checkpoint is committed atomically with the rows it describes.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO etl_checkpoint
+          (file_id, source_path, source_size, source_sha256, records_committed, chunks_committed, status)
+        VALUES (%s,%s,%s,%s,%s,%s,%s)
+        ON DUPLICATE KEY UPDATE records_committed=VALUES(records_committed),
+          chunks_committed=VALUES(chunks_committed), status=VALUES(status)
+    """, (file_id, fingerprint["source_path"], fingerprint["source_size"], fingerprint["source_sha256"],
+          records, chunks, status))
+    cur.close()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load property JSON into the MySQL star schema.")
+    parser.add_argument("--chunk-size", type=int, default=None,
+                        help="records per load chunk (default: load.chunk_size in etl_config.yaml)")
+    parser.add_argument("--stream", action="store_true",
+                        help="commit after every chunk instead of once at the end of the run")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processes for the transform stage (default: transform.workers or 1)")
+    parser.add_argument("--engine", choices=sorted(TRANSFORM_ENGINES), default=None,
+                        help="transform implementation (default: transform.engine or scalar)")
+    parser.add_argument("--check-engines", action="store_true",
+                        help="compare the columnar engine against the scalar one on the input and exit")
+    parser.add_argument("--parse-workers", type=int, default=None,
+                        help="processes parsing JSONL input via its byte-offset index (default: read.parse_workers or 1)")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="overlap reading, transforming and loading on separate threads with bounded queues")
+    parser.add_argument("--parallel-load", action="store_true",
+                        help="upsert independent dimensions concurrently on pooled connections (also load.parallel)")
+    parser.add_argument("--dedupe", choices=[*DEDUPE_RULES, "off"], default=None,
+                        help="which copy of a property repeated within a chunk to load (default: load.dedupe or last)")
+    parser.add_argument("--full-refresh", action="store_true",
+                        help="transform and load every record, not only new or changed ones")
+    parser.add_argument("--no-resume", action="store_true",
+                        help="ignore any checkpoint left by a failed run and start from the first record")
+    parser.add_argument("--sink", default=None,
+                        help="write per-table TSV load files with locally assigned keys to this directory "
+                             "instead of connecting to the database (load them with import_sink.py)")
+    parser.add_argument("--report", default=None,
+                        help="write the JSON run report here (default: report.json in etl_config.yaml)")
+    parser.add_argument("--prometheus", default=None,
+                        help="also write the run metrics as a Prometheus textfile (default: report.prometheus)")
+    parser.add_argument("--profile", nargs="?", const=DEFAULT_PROFILE_PATH, default=None,
+                        help="cProfile the transform loop (in-process) and write the stats to this file "
+                             "(default: logs/etl_transform.prof)")
+    return parser.parse_args(argv)
+
+def _project_path(path):
+    """Config paths are relative to the project root."""
+    return path if not path or os.path.isabs(path) else os.path.join(BASE_DIR, path)
+
+def write_run_report(metrics, status, report_path, prometheus_path):
+    """Print the per-stage summary and write the JSON report / Prometheus textfile."""
+    report = metrics.report(status)
+    print("\n  Stage metrics:")
+    print(f"    {'stage':<10}{'seconds':>9}{'rows':>10}{'rows/s':>11}{'SQL':>7}{'affected':>10}")
+    for st in report["stages"]:
+        rate = f"{st['rows_per_sec']:,.0f}" if st["rows_per_sec"] else "-"
+        print(f"    {st['stage']:<10}{st['seconds']:>9.2f}{st['rows']:>10}{rate:>11}"
+              f"{st['statements']:>7}{st['rows_affected']:>10}")
+    for table, h in report["upsert_latency"].items():
+        print(f"    upsert {table}: {h['count']} calls, p50 <= {h['p50_s'] * 1000:.1f} ms, "
+              f"p95 <= {h['p95_s'] * 1000:.1f} ms, max {h['max_s'] * 1000:.1f} ms")
+    try:
+        if report_path:
+            write_json_report(report_path, report)
+            print(f"  Run report written to {report_path}")
+        if prometheus_path:
+            write_prometheus_textfile(prometheus_path, report, metrics)
+            print(f"  Prometheus metrics written to {prometheus_path}")
+    except OSError as e:
+        print(f"  Warning: could not write run report: {e}")
+
+def main(argv=None):
     """Main ETL function to extract, transform, and load property data."""
+    args = parse_args(argv)
+    metrics = RunMetrics()
     print("=" * 60)
     print("Starting ETL Process")
     print("=" * 60)
     
     print("\n[Step 1] Loading configuration...")
-    cfg = load_config()
-    defaults = cfg.get("defaults") or {}
-    country_default = defaults.get("country", "USA")
-    print(f"  Default country: {country_default}")
+    with metrics.stage("config"):
+        cfg = load_config()
+        plan = compile_transform_plan(cfg)
+    mapped = sum(len(plan[t][1]) for t in MAPPED_TABLES.values())
+    print(f"  Compiled transform plan: {mapped} mapped columns, default country: {plan['dim_address'][0].get('country')}")
+    load_cfg = cfg.get("load") or {}
+    chunk_size = args.chunk_size or int(load_cfg.get("chunk_size") or DEFAULT_CHUNK_SIZE)
+    stream = args.stream or bool(load_cfg.get("stream", False))
+    parallel_load = args.parallel_load or bool(load_cfg.get("parallel", False))
+    if parallel_load:
+        # Facts hold shared locks on the dimension rows they reference until commit, and
+        # a later chunk's pooled upsert of the same rows would wait on them indefinitely.
+        stream = True
+    print(f"  Load chunk size: {chunk_size} ({'commit per chunk' if stream else 'single transaction'})")
+    workers = args.workers or int((cfg.get("transform") or {}).get("workers") or 1)
+    engine = args.engine or (cfg.get("transform") or {}).get("engine") or "scalar"
+    profiler = None
+    if args.profile:
+        # Worker processes cannot be profiled from here, so profiling transforms in-process.
+        workers = 1
+        profiler = cProfile.Profile()
+        print(f"  Profiling the transform loop (in-process) -> {args.profile}")
+    print(f"  Transform workers: {workers} ({engine} engine)")
+    parse_workers = args.parse_workers or int((cfg.get("read") or {}).get("parse_workers") or 1)
+    if parse_workers > 1:
+        print(f"  JSONL parse workers: {parse_workers}")
+    pipeline_cfg = cfg.get("pipeline") or {}
+    pipelined = args.pipeline or bool(pipeline_cfg.get("enabled", False))
+    queue_size = int(pipeline_cfg.get("queue_size") or DEFAULT_QUEUE_SIZE)
+    if pipelined:
+        print(f"  Pipelined execution with queues of {queue_size} chunks")
+    if parallel_load:
+        print(f"  Parallel dimension load on {len(PARALLEL_DIMENSIONS)} pooled connections")
+    dedupe = args.dedupe or load_cfg.get("dedupe") or DEFAULT_DEDUPE
+    if dedupe != "off" and dedupe not in DEDUPE_RULES:
+        raise ValueError(f"Unknown load.dedupe rule {dedupe!r}; expected one of {', '.join([*DEDUPE_RULES, 'off'])}")
+    print(f"  In-chunk duplicates: {'kept' if dedupe == 'off' else f'one copy per property ({dedupe})'}")
+    incremental = bool(load_cfg.get("incremental", True)) and not args.full_refresh
+    print(f"  Change detection: {'incremental (new/changed records only)' if incremental else 'full refresh'}")
+    cache_cfg = cfg.get("cache") or {}
+    cache_size = int(cache_cfg.get("size", DEFAULT_CACHE_SIZE) or 0)
+    caches = {table: LRUCache(cache_size) for table in DIMENSIONS} if cache_size > 0 else {}
+    print(f"  Key cache size per dimension: {cache_size}")
+    report_cfg = cfg.get("report") or {}
+    report_path = _project_path(args.report or report_cfg.get("json"))
+    prometheus_path = _project_path(args.prometheus or report_cfg.get("prometheus"))
+    metrics.info["options"] = {
+        "chunk_size": chunk_size, "stream": stream, "engine": engine, "workers": workers,
+        "parse_workers": parse_workers, "pipeline": pipelined, "parallel_load": parallel_load,
+        "incremental": incremental, "dedupe": dedupe,
+        "cache_size": cache_size,
+    }
 
     if not os.path.exists(DATA_PATH):
         raise FileNotFoundError(f"Input JSON not found at {DATA_PATH}")
     
     print(f"\n[Step 2] Reading input data from {DATA_PATH}...")
-    records = read_input_records(DATA_PATH)
-    if not records:
+    with metrics.stage("read"):
+        records = iter_input_records(DATA_PATH, with_source=True)
+        first = next(records, None)
+    if first is None:
         print("No records found; nothing to do.")
         return
-    print(f"  Found {len(records)} property records")
+    records = chain([first], records)
+    if args.check_engines:
+        checked = mismatched = 0
+        for chunk in iter_chunks(records, chunk_size):
+            bad = check_engine_parity([rec for _, _, rec in chunk], plan)
+            for i in bad[:5]:
+                print(f"  Mismatch at record {checked + i}")
+            checked += len(chunk)
+            mismatched += len(bad)
+        print(f"  Engine parity: {checked - mismatched}/{checked} records identical")
+        if mismatched:
+            raise SystemExit(1)
+        return
+    with metrics.stage("read"):
+        fingerprint = file_fingerprint(DATA_PATH)
+    file_id = checkpoint_id(fingerprint)
+    source_key = load_source_key(file_id, config_digest(cfg), dedupe)
+    metrics.info["input"] = fingerprint
+    print(f"  Streaming property records (sha256 {fingerprint['source_sha256'][:12]}, {fingerprint['source_size']} bytes)")
+
+    if args.sink:
+        sink_dir = _project_path(args.sink)
+        print(f"\n[Step 3] Writing load files to {sink_dir} (no database connection)...")
+        status = "failed"
+        try:
+            sink = FileSink(sink_dir, file_id)
+            if parse_workers > 1 and not is_json_array(DATA_PATH):
+                chunks = iter_parsed_chunks(DATA_PATH, chunk_size, parse_workers)
+            else:
+                chunks = iter_chunks(records, chunk_size)
+            processed, duplicates = write_sink(sink, metrics.timed("read", chunks), plan, config_digest(cfg),
+                                               workers, engine, dedupe, metrics, pipelined, queue_size,
+                                               source_key)
+            manifest = sink.close({"input": fingerprint, "records": processed, "duplicates": duplicates})
+            metrics.info["records"] = {"processed": processed, "duplicates": duplicates}
+            metrics.info["sink"] = {t["table"]: t["rows"] for t in manifest["tables"]}
+            print(f"\n[Step 4] Wrote {processed} records ({duplicates} duplicate copies dropped):")
+            for t in manifest["tables"]:
+                print(f"    {t['file']}: {t['rows']} rows")
+            print(f"  Load them with: python import_sink.py {sink_dir}")
+            status = "success"
+        finally:
+            write_run_report(metrics, status, report_path, prometheus_path)
+        return
 
     print("\n[Step 3] Connecting to database...")
-    conn = get_conn()
+    pipeline = None
+    detector_conn = None
+    pool = None
+    loader = None
+    status = "failed"
+    conn = InstrumentedConnection(get_conn(), metrics)
     try:
         print("  Connection established successfully")
         
         print("\n[Step 4] Creating/updating database schema...")
-        run_schema(conn)
-        print("  Schema created/updated successfully")
+        with metrics.stage("schema"):
+            if run_schema(conn):
+                print("  Schema created/updated successfully")
 
-        print("\n[Step 5] Staging raw data...")
-        cur = conn.cursor()
-        cur.execute("TRUNCATE TABLE stg_properties_raw")
-        cur.executemany("INSERT INTO stg_properties_raw (raw_json) VALUES (%s)",
-                        [(json.dumps(r),) for r in records])
-        cur.close()
-        print(f"  Staged {len(records)} raw records")
-
-        print("\n[Step 6] Transforming and loading data...")
-        processed = 0
-        for rec in records:
-            bk_parts = [
-                rec.get("Street_Address"),
-                rec.get("City"),
-                rec.get("State"),
-                rec.get("Zip"),
-            ]
-            property_bk = hash_key(bk_parts)
-
-            prop = {
-                "property_bk": property_bk,
-                "year_built": rec.get("Year_Built"),
-                "property_type": rec.get("Property_Type"),
-                "square_feet": parse_number(rec.get("SQFT_Total")),
-                "bedrooms": parse_number(rec.get("Bed")),
-                "bathrooms": parse_number(rec.get("Bath")),
-                "lot_size_sqft": None,
-            }
+            if caches and cache_cfg.get("warm", True):
+                warmed = warm_key_caches(conn, caches)
+                print(f"  Warmed key caches with {warmed} existing dimension keys")
 
-            addr = {
-                "address_line1": rec.get("Street_Address"),
-                "address_line2": None,
-                "city": rec.get("City"),
-                "state": rec.get("State"),
-                "postal_code": rec.get("Zip"),
-                "county": None,
-                "country": country_default,
-                "latitude": parse_number(rec.get("Latitude")),
-                "longitude": parse_number(rec.get("Longitude")),
-            }
+            resume_from, chunk_no = (0, 0) if args.no_resume else read_checkpoint(conn, file_id)
+        print("\n[Step 5] Staging raw data...")
+        if resume_from:
+            # Staged rows of the committed chunks are kept; only the remainder is appended.
+            print(f"  Resuming after {resume_from} records committed by a previous run")
+        else:
+            with metrics.stage("stage"):
+                reset_staging(conn)
 
-            hoa = aggregate_hoa(rec.get("HOA"))
-            val = best_valuation(rec.get("Valuation"))
-            reh = aggregate_rehab(rec.get("Rehab"))
-
-            tax = None
-            if rec.get("Taxes") not in (None, "", " "):
-                tax = {"tax_year": None, "assessed_value": None, "tax_amount": parse_number(rec.get("Taxes"))}
-
-            prop_sk = upsert(conn, "dim_property", prop)
-            addr_sk = upsert(conn, "dim_address", addr)
-            hoa_sk = upsert(conn, "dim_hoa", hoa) if (hoa and any(v is not None for v in hoa.values())) else None
-            val_sk = upsert(conn, "dim_valuation", val) if (val and any(v is not None for v in val.values())) else None
-            reh_sk = upsert(conn, "dim_rehab", reh) if (reh and any(v is not None for v in reh.values())) else None
-            tax_sk = upsert(conn, "dim_tax", tax) if (tax and any(v is not None for v in tax.values())) else None
-
-            eff_date = (val or {}).get("as_of_date") or (reh or {}).get("as_of_date") or "1970-01-01"
-            cur = conn.cursor()
-            cur.execute("""
-                INSERT INTO fact_property_snapshot
-                  (property_sk, address_sk, hoa_sk, valuation_sk, rehab_sk, tax_sk, effective_date, source_record_id)
-                VALUES (%s,%s,%s,%s,%s,%s,%s,%s)
-            """, (prop_sk, addr_sk, hoa_sk, val_sk, reh_sk, tax_sk, eff_date, None))
-            cur.close()
-            
-            processed += 1
-            if processed % 100 == 0:
-                print(f"  Processed {processed}/{len(records)} records...")
+        print("\n[Step 6] Staging, transforming and loading data...")
+        stager = RawStager(conn, use_infile=load_cfg.get("staging", "infile") == "infile")
+        if parallel_load:
+            pool = ConnectionPool(len(PARALLEL_DIMENSIONS), lambda: InstrumentedConnection(get_conn(), metrics))
+            loader = ParallelDimensionLoader(pool, metrics)
+        # Pooled connections keep the totals of the tables they write themselves.
+        counted = [t for t in COUNTED_TABLES if not (loader and t in PARALLEL_DIMENSIONS)]
+        processed = committed = resume_from
+        duplicates = 0
+        if parse_workers > 1 and not is_json_array(DATA_PATH):
+            # The line index lets workers parse disjoint byte ranges and resume by seeking.
+            chunks = iter_parsed_chunks(DATA_PATH, chunk_size, parse_workers, start=resume_from)
+        else:
+            chunks = iter_chunks(islice(records, resume_from, None), chunk_size)
+        chunks = metrics.timed("read", chunks)
+        if pipelined:
+            # Change detection runs on the read thread, so it gets its own connection.
+            detector_conn = InstrumentedConnection(get_conn(), metrics)
+            detector = ChangeDetector(detector_conn, plan, config_digest(cfg), not incremental, own_connection=True,
+                                      dedupe=dedupe, source_key=source_key)
+            pipeline = Pipeline(metrics.timed("detect", detector.batches(chunks)),
+                                lambda items: iter_transformed(items, plan, workers, engine, metrics, profiler),
+                                queue_size)
+            transformed = pipeline
+        else:
+            detector = ChangeDetector(conn, plan, config_digest(cfg), not incremental, dedupe=dedupe,
+                                      source_key=source_key)
+            transformed = iter_transformed(metrics.timed("detect", detector.batches(chunks)),
+                                           plan, workers, engine, metrics, profiler)
+        for batch in transformed:
+            for stage in ("read", "detect"):
+                metrics.add_rows(stage, len(batch["records"]))
+            metrics.add_rows("transform", len(batch["todo"]))
+            with metrics.stage("stage"):
+                stager.stage(batch["raw"])
+            metrics.add_rows("stage", len(batch["raw"]))
+            with metrics.stage("load"):
+                rows, source_ids, dropped = dedupe_rows(batch["rows"], batch["todo_ids"], dedupe)
+                duplicates += dropped
+                previous = read_contributions(conn, rows)
+                load_chunk(conn, rows, caches, source_ids, metrics, loader, file_id)
+                update_property_summary(conn, rows, previous)
+                save_fingerprints(conn, batch["fingerprints"])
+            if not pipelined:
+                detector.release(batch["fingerprints"])
+            metrics.add_rows("load", len(rows))
+            processed += len(batch["records"])
+            chunk_no += 1
+            if stream:
+                with metrics.stage("commit"):
+                    update_table_totals(conn, counted)
+                    save_checkpoint(conn, file_id, fingerprint, processed, chunk_no)
+                    conn.commit()
+                if pipelined:
+                    detector.release(batch["fingerprints"])
+                metrics.add_rows("commit", processed - committed)
+                committed = processed
+            print(f"  Processed {processed} records...")
 
-        conn.commit()
+        with metrics.stage("commit"):
+            update_table_totals(conn, counted)
+            save_checkpoint(conn, file_id, fingerprint, processed, chunk_no, status="complete")
+            conn.commit()
+        metrics.add_rows("commit", processed - committed)
+        status = "success"
         print(f"\n[Step 7] Committing transaction...")
         print(f"  Successfully processed {processed} records")
+        counts = detector.counts
+        print(f"  New: {counts['new']}, changed: {counts['changed']}, unchanged: {counts['unchanged']}"
+              f"{' (all reloaded, full refresh)' if not incremental else ' (skipped)'}")
+        if dedupe != "off":
+            print(f"  Duplicate copies dropped within chunks: {duplicates}")
+        metrics.info["records"] = {"processed": processed, **counts, "duplicates": duplicates}
+        if pipeline:
+            metrics.info["pipeline"] = pipeline.report()
+            print("\n  Pipeline stage timings (seconds):")
+            for st in pipeline.report():
+                print(f"    {st['stage']:<9}: busy {st['busy_s']:.2f}, waiting for input {st['waiting_for_input_s']:.2f}, "
+                      f"blocked on output {st['blocked_on_output_s']:.2f} ({st['items']} chunks)")
+        if caches:
+            metrics.info["key_cache"] = {table: {"hits": c.hits, "misses": c.misses, "size": len(c)}
+                                         for table, c in caches.items()}
+            print("\n  Key cache usage:")
+            for table, cache in caches.items():
+                lookups = cache.hits + cache.misses
+                rate = (100.0 * cache.hits / lookups) if lookups else 0.0
+                print(f"    {table}: {cache.hits} hits, {cache.misses} misses ({rate:.1f}% hit rate), {len(cache)} cached")
+        if profiler:
+            os.makedirs(os.path.dirname(os.path.abspath(args.profile)), exist_ok=True)
+            profiler.dump_stats(args.profile)
+            print(f"\n  Transform profile written to {args.profile}; top functions by cumulative time:")
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(15)
         print("\n" + "=" * 60)
         print("ETL completed successfully!")
         print("=" * 60)
@@ -339,8 +1711,17 @@ def main():
         traceback.print_exc()
         raise
     finally:
+        if pipeline:
+            pipeline.close()
+        if loader:
+            loader.close()
+        if pool:
+            pool.close()
+        if detector_conn:
+            detector_conn.close()
         conn.close()
         print("\nDatabase connection closed.")
+        write_run_report(metrics, status, report_path, prometheus_path)
 
 if __name__ == "__main__":
     main()
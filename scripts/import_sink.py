@@ -0,0 +1,204 @@
+"""
+Import step for the load files written by an offline run (`etl.py --sink DIR`).
+
+Each file is loaded with LOAD DATA LOCAL INFILE into a temporary copy of its table,
+keeping the last line per key, and then merged into the warehouse in foreign key
+order (dimensions, facts, record fingerprints) with set-based
+INSERT ... SELECT ... ON DUPLICATE KEY UPDATE statements over ranges of keys. The
+sink numbers each dimension from 1; new rows take that key plus an offset above the
+table's current MAX, so a backfill into empty tables keeps the sink's keys. Rows that
+already exist keep theirs, and facts are pointed at the warehouse rows by natural key.
+Each range commits on its own; merging is idempotent, so a failed import can be rerun.
+fact_property_current and agg_property_summary are rebuilt at the end, and the input
+is recorded in etl_checkpoint with status "imported".
+
+    python import_sink.py ../out/backfill --batch-size 200000
+"""
+import os
+import sys
+import json
+import argparse
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from aggregates import rebuild_property_current, rebuild_property_summary
+from etl import (DIMENSIONS, HASHED_DIMENSIONS, ROW_HASH_COLUMN, FACT_COLUMNS, FACT_KEY, COUNTED_TABLES,
+                 FINGERPRINT_COLUMNS, SINK_MANIFEST, SINK_TABLES, checkpoint_id, run_schema, save_checkpoint,
+                 update_table_totals)
+from utils import get_conn
+
+DEFAULT_BATCH_SIZE = 100000
+FACT_TABLE = "fact_property_snapshot"
+FINGERPRINT_TABLE = "etl_record_fingerprint"
+
+
+def read_manifest(directory):
+    path = os.path.join(directory, SINK_MANIFEST)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No {SINK_MANIFEST} in {directory}; the sink run did not finish")
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    tables = {t["table"]: t for t in manifest["tables"]}
+    missing = [table for table in SINK_TABLES if table not in tables]
+    if missing:
+        raise ValueError(f"{SINK_MANIFEST} lists no file for {', '.join(missing)}")
+    return manifest, tables
+
+
+def staged_name(table):
+    return f"imp_{table}"
+
+
+def stage_file(conn, directory, entry):
+    """
+    LOAD DATA one sink file into a temporary copy of its table. REPLACE keeps the last
+    line per primary or unique key, as the ETL's upserts would. Returns the rows loaded.
+    """
+    table, tmp = entry["table"], staged_name(entry["table"])
+    cur = conn.cursor()
+    cur.execute(f"DROP TEMPORARY TABLE IF EXISTS {tmp}")
+    cur.execute(f"CREATE TEMPORARY TABLE {tmp} LIKE {table}")
+    if entry["rows"]:
+        cur.execute(f"LOAD DATA LOCAL INFILE %s REPLACE INTO TABLE {tmp} CHARACTER SET utf8mb4 "
+                    "FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' "
+                    f"({','.join(entry['columns'])})", (os.path.join(directory, entry["file"]),))
+    cur.close()
+    return entry["rows"]
+
+
+def _max_id(cur, table, column):
+    cur.execute(f"SELECT COALESCE(MAX({column}), 0) FROM {table}")
+    return int(cur.fetchone()[0])
+
+
+def merge_ranges(conn, sql, tmp, id_column, batch_size, params=()):
+    """Run sql (ending in a range condition on id_column) over tmp in ranges of batch_size ids, committing each."""
+    cur = conn.cursor(buffered=True)
+    last = _max_id(cur, tmp, id_column)
+    for low in range(0, last, batch_size):
+        cur.execute(sql, (*params, low, low + batch_size))
+        conn.commit()
+    cur.close()
+
+
+def merge_dimension(conn, table, columns, batch_size):
+    """Upsert a staged dimension; new rows get their sink key plus the table's current MAX key."""
+    pk_col, _ = DIMENSIONS[table]
+    tmp = staged_name(table)
+    data_cols = [c for c in columns if c != pk_col]
+    cur = conn.cursor(buffered=True)
+    offset = _max_id(cur, table, pk_col)
+    cur.close()
+    updates = ",".join([f"{c}=VALUES({c})" for c in data_cols])
+    merge_ranges(conn, f"INSERT INTO {table} ({pk_col},{','.join(data_cols)}) "
+                       f"SELECT {pk_col} + %s, {','.join(data_cols)} FROM {tmp} "
+                       f"WHERE {pk_col} > %s AND {pk_col} <= %s ON DUPLICATE KEY UPDATE {updates}",
+                 tmp, pk_col, batch_size, (offset,))
+    return offset
+
+
+def _warehouse_key(table):
+    """
+    Warehouse surrogate key of the staged dimension row a fact references, found by
+    natural key (row_hash for HASHED_DIMENSIONS); NULL when the fact has no such row.
+    The lowest key wins, like bulk_upsert()'s lookup.
+    """
+    pk_col, key_cols = DIMENSIONS[table]
+    tmp = staged_name(table)
+    if table in HASHED_DIMENSIONS:
+        match = f"d.{ROW_HASH_COLUMN} = {tmp}.{ROW_HASH_COLUMN}"
+    else:
+        match = " AND ".join([f"d.{c} <=> {tmp}.{c}" for c in key_cols])
+    return f"(SELECT MIN(d.{pk_col}) FROM {table} d WHERE {tmp}.{pk_col} IS NOT NULL AND {match})"
+
+
+def merge_facts(conn, batch_size):
+    """Upsert the staged facts on their natural key, with dimension keys resolved in the warehouse."""
+    tmp = staged_name(FACT_TABLE)
+    joins = " ".join([f"LEFT JOIN {staged_name(table)} ON {staged_name(table)}.{pk_col} = f.{pk_col}"
+                      for table, (pk_col, _) in DIMENSIONS.items()])
+    keys = ", ".join([_warehouse_key(table) for table in DIMENSIONS])
+    updates = ",".join([f"{c}=VALUES({c})" for c in FACT_COLUMNS if c not in FACT_KEY])
+    merge_ranges(conn, f"INSERT INTO {FACT_TABLE} ({','.join(FACT_COLUMNS)}) "
+                       f"SELECT {keys}, f.effective_date, f.source_record_id, f.source_file_id FROM {tmp} f {joins} "
+                       f"WHERE f.snapshot_id > %s AND f.snapshot_id <= %s ON DUPLICATE KEY UPDATE {updates}",
+                 tmp, "snapshot_id", batch_size)
+
+
+def merge_fingerprints(conn):
+    columns = ",".join(FINGERPRINT_COLUMNS)
+    cur = conn.cursor()
+    cur.execute(f"INSERT INTO {FINGERPRINT_TABLE} ({columns}) SELECT {columns} FROM {staged_name(FINGERPRINT_TABLE)} "
+                "ON DUPLICATE KEY UPDATE " + ",".join([f"{c}=VALUES({c})" for c in FINGERPRINT_COLUMNS[1:]]))
+    cur.close()
+    conn.commit()
+
+
+def import_sink(directory, batch_size=DEFAULT_BATCH_SIZE):
+    manifest, entries = read_manifest(directory)
+    print("=" * 60)
+    print(f"Importing load files from {directory}")
+    print("=" * 60)
+    print(f"  {manifest.get('records', '?')} source records, written from "
+          f"{(manifest.get('input') or {}).get('source_path', 'unknown input')}")
+    started = perf_counter()
+    conn = get_conn(infile_dir=os.path.abspath(directory))
+    try:
+        print("\n[Step 1] Creating/updating database schema...")
+        if run_schema(conn):
+            print("  Schema created/updated successfully")
+
+        print("\n[Step 2] Staging load files...")
+        for table in SINK_TABLES:
+            t0 = perf_counter()
+            rows = stage_file(conn, directory, entries[table])
+            print(f"  {table}: {rows} rows in {perf_counter() - t0:.2f}s")
+
+        print("\n[Step 3] Merging dimensions, facts and fingerprints...")
+        for table in DIMENSIONS:
+            t0 = perf_counter()
+            offset = merge_dimension(conn, table, entries[table]["columns"], batch_size)
+            print(f"  {table}: new keys from {offset + 1} ({perf_counter() - t0:.2f}s)")
+        t0 = perf_counter()
+        merge_facts(conn, batch_size)
+        print(f"  {FACT_TABLE}: {perf_counter() - t0:.2f}s")
+        merge_fingerprints(conn)
+
+        print("\n[Step 4] Rebuilding derived tables...")
+        update_table_totals(conn, [t for t in COUNTED_TABLES if t in DIMENSIONS or t == FACT_TABLE])
+        if manifest.get("input"):
+            # The facts' source_file_id refers to this checkpoint row for the input's path.
+            save_checkpoint(conn, checkpoint_id(manifest["input"]), manifest["input"],
+                            manifest.get("records", 0), 0, status="imported")
+        rebuild_property_current(conn)
+        rebuild_property_summary(conn)
+        conn.commit()
+
+        cur = conn.cursor()
+        for table in SINK_TABLES:
+            cur.execute(f"DROP TEMPORARY TABLE IF EXISTS {staged_name(table)}")
+        cur.close()
+        print(f"\nImport completed in {perf_counter() - started:.2f}s")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load the files written by etl.py --sink into the warehouse.")
+    parser.add_argument("directory", help="directory holding the sink's manifest.json and TSV files")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"keys merged (and committed) per statement (default: {DEFAULT_BATCH_SIZE})")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    import_sink(args.directory, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
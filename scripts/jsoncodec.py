@@ -0,0 +1,80 @@
+"""
+JSON codec for the ETL: orjson when it is installed, the stdlib json module otherwise.
+Both backends decode to the same Python objects and encode to the same text, so row
+content, staged text and content fingerprints do not depend on which one is in use.
+"""
+import json
+import math
+import re
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+# orjson spells some floats differently from repr() (1e16 vs 1e+16, 0.00001 vs 1e-05);
+# every such spelling contains an exponent or "0.0000". Strings can match too, which
+# only costs a fallback to the stdlib encoder.
+_EXPONENT = re.compile(rb"e[-\d]")
+
+
+def loads(data):
+    """Decode a JSON document from str or bytes."""
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # NaN/Infinity literals, integers wider than 64 bits and lone surrogates
+            # are rejected by orjson but accepted by json; let json decide.
+            pass
+    return json.loads(data)
+
+
+def _has_non_finite(obj):
+    """True if obj holds a NaN or infinite float, which orjson writes as null."""
+    stack = [obj]
+    while stack:
+        value = stack.pop()
+        kind = type(value)
+        # Exact type checks first: this walk runs for every record with a null in it.
+        if kind is str or kind is int or value is None:
+            continue
+        if kind is float:
+            if value - value:  # nan for NaN and both infinities, 0.0 otherwise
+                return True
+        elif kind is dict:
+            stack.extend(value.values())
+        elif kind is list or kind is tuple:
+            stack.extend(value)
+        elif isinstance(value, float):
+            if not math.isfinite(value):
+                return True
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+    return False
+
+
+def dumps(obj, sort_keys=False, default=None):
+    """
+    Encode obj as compact JSON text, identical to
+    json.dumps(obj, sort_keys=sort_keys, separators=(",", ":"), default=default).
+    Output orjson would spell differently (non-ASCII text, exponent floats, non-finite
+    floats, keys or integers it does not support) is produced by the stdlib encoder instead.
+    """
+    if orjson is not None:
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            out = orjson.dumps(obj, default=default, option=option)
+        except TypeError:
+            out = None
+        if (out is not None and out.isascii() and b"\x7f" not in out
+                and b"0.0000" not in out and not _EXPONENT.search(out)
+                and not (b"null" in out and _has_non_finite(obj))):
+            return out.decode("ascii")
+    return json.dumps(obj, sort_keys=sort_keys, separators=(",", ":"), default=default)
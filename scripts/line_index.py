@@ -0,0 +1,131 @@
+"""
+Byte-offset index for JSONL inputs.
+The index lists the byte offset of every non-blank line, is persisted next to the
+input as <file>.idx, and lets records be read by offset and parsed in parallel.
+"""
+import codecs
+import json
+import mmap
+import os
+import struct
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import jsoncodec
+
+_MAGIC = b"JLIDX1\0\0"
+# magic, file size, file mtime (ns), number of offsets
+_HEADER = struct.Struct("<8sQQQ")
+
+
+def index_path(path):
+    return path + ".idx"
+
+
+def _scan_offsets(path):
+    offsets = array("Q")
+    if os.path.getsize(path) == 0:
+        return offsets
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        size = len(mm)
+        start = 0
+        while start < size:
+            end = mm.find(b"\n", max(start, 2 * start - offset))
+            if end < 0:
+                end = size
+            if mm[start:end].strip():
+                offsets.append(start)
+            start = end + 1
+    return offsets
+
+
+def load_line_index(path, persist=True):
+    """
+    Return the line-offset index of a JSONL file as an array of uint64 offsets.
+    A persisted index is reused while the file's size and mtime match; otherwise
+    it is rebuilt by scanning a memory map of the file (and saved when persist is set).
+    """
+    st = os.stat(path)
+    idx = index_path(path)
+    try:
+        with open(idx, "rb") as f:
+            magic, size, mtime, count = _HEADER.unpack(f.read(_HEADER.size))
+            if magic == _MAGIC and size == st.st_size and mtime == st.st_mtime_ns:
+                offsets = array("Q")
+                offsets.fromfile(f, count)
+                return offsets
+    except (OSError, struct.error, EOFError):
+        pass
+
+    offsets = _scan_offsets(path)
+    if persist:
+        tmp = idx + ".tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(_HEADER.pack(_MAGIC, st.st_size, st.st_mtime_ns, len(offsets)))
+                offsets.tofile(f)
+            os.replace(tmp, idx)
+        except OSError as e:
+            print(f"  Warning: could not persist line index {idx}: {e}")
+    return offsets
+
+
+def _read_line(mm, offset):
+    end = mm.find(b"\n", offset)
+    return mm[offset:end if end >= 0 else len(mm)]
+
+
+def read_record_at(path, offset):
+    """
+    Decode the record starting at a byte offset (a fact's source_record_id), in a JSONL
+    or a JSON array input. An array element can span lines and is followed by a comma or
+    the closing bracket, so the text from the offset is decoded up to the end of the
+    first complete JSON value, reading on (to twice as far each time) until there is one.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        text, start = "", offset
+        while True:
+            end = mm.find(b"\n", max(start, 2 * start - offset))
+            end = len(mm) if end < 0 else end + 1
+            text += utf8.decode(mm[start:end], final=end == len(mm))
+            try:
+                return decoder.raw_decode(text)[0]
+            except json.JSONDecodeError:
+                if end == len(mm):
+                    raise
+            start = end
+
+
+def parse_offsets(path, offsets):
+    """Parse the records at the given offsets; returns (offset, raw text, record) triples."""
+    out = []
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for offset in offsets:
+            raw = _read_line(mm, offset).decode("utf-8").strip()
+            out.append((offset, raw, jsoncodec.loads(raw)))
+    return out
+
+
+def iter_parsed_chunks(path, chunk_size, workers, start=0):
+    """
+    Yield chunks of (offset, raw text, record) triples in file order, starting at
+    record number start. Each chunk is a disjoint slice of the offset index parsed
+    by a worker process; at most two chunks per worker are in flight.
+    """
+    offsets = load_line_index(path)
+    bounds = range(start, len(offsets), chunk_size)
+    if workers <= 1:
+        for lo in bounds:
+            yield parse_offsets(path, offsets[lo:lo + chunk_size].tolist())
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for lo in bounds:
+            pending.append(pool.submit(parse_offsets, path, offsets[lo:lo + chunk_size].tolist()))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
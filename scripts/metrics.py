@@ -0,0 +1,257 @@
+"""
+Run instrumentation for the ETL: per-stage wall time, rows, SQL statements and rows
+affected, per-dimension upsert latency histograms, and the run report written as JSON
+and (optionally) as a Prometheus textfile.
+"""
+import os
+import json
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from time import perf_counter, time
+
+STAGES = ("config", "read", "schema", "stage", "detect", "transform", "load", "commit")
+# Upper bounds (seconds) of the upsert latency buckets; the last bucket is +Inf.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (Prometheus style, cumulative on export)."""
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def cumulative(self):
+        """(upper bound, observations <= bound) pairs, ending with +Inf."""
+        total = 0
+        out = []
+        for bound, n in zip(self.buckets + (float("inf"),), self.counts):
+            total += n
+            out.append((bound, total))
+        return out
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (max for the +Inf bucket)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        for bound, total in self.cumulative():
+            if total >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "sum_s": round(self.sum, 6),
+            "max_s": round(self.max, 6),
+            "p50_s": self.quantile(0.5),
+            "p95_s": self.quantile(0.95),
+            "p99_s": self.quantile(0.99),
+            "buckets": {("+Inf" if b == float("inf") else str(b)): n for b, n in self.cumulative()},
+        }
+
+
+class StageMetrics:
+    def __init__(self, name):
+        self.name = name
+        self.seconds = 0.0
+        self.rows = 0
+        self.statements = 0
+        self.rows_affected = 0
+
+    def as_dict(self):
+        return {
+            "stage": self.name,
+            "seconds": round(self.seconds, 3),
+            "rows": self.rows,
+            "rows_per_sec": round(self.rows / self.seconds, 1) if self.seconds and self.rows else None,
+            "statements": self.statements,
+            "rows_affected": self.rows_affected,
+        }
+
+
+class RunMetrics:
+    """
+    Collects per-stage metrics for one run. Stage time is exclusive: a stage entered
+    while another is active on the same thread pauses the outer one, so time spent
+    pulling the next chunk from the reader is not charged to the transform. SQL sent
+    through an InstrumentedConnection is charged to the stage active on the calling
+    thread. In pipelined runs stages overlap, so their times add up to more than the
+    run's wall time.
+    """
+    def __init__(self):
+        self.started = time()
+        self._t0 = perf_counter()
+        self.stages = {name: StageMetrics(name) for name in STAGES}
+        self.upserts = {}
+        self.info = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _charge(self, entry, now):
+        name, mark, timed = entry
+        if timed:
+            with self._lock:
+                self.stages[name].seconds += now - mark
+
+    @contextmanager
+    def stage(self, name, timed=True):
+        """
+        Charge the block's time and SQL to stage name. Helper threads working for a
+        stage timed on another thread pass timed=False, so only their SQL is counted.
+        """
+        stack = self._stack()
+        now = perf_counter()
+        if stack:
+            self._charge(stack[-1], now)
+        stack.append([name, now, timed])
+        try:
+            yield
+        finally:
+            now = perf_counter()
+            self._charge(stack.pop(), now)
+            if stack:
+                stack[-1][1] = now
+
+    def timed(self, name, iterable):
+        """Iterate iterable, charging the time spent producing each item to stage name."""
+        it = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(it)
+                except StopIteration:
+                    return
+            yield item
+
+    def add_rows(self, name, rows):
+        with self._lock:
+            self.stages[name].rows += rows
+
+    def count_sql(self, rows_affected=0):
+        stack = self._stack()
+        name = stack[-1][0] if stack else "other"
+        with self._lock:
+            stage = self.stages.get(name) or self.stages.setdefault(name, StageMetrics(name))
+            stage.statements += 1
+            stage.rows_affected += max(rows_affected, 0)
+
+    def observe_upsert(self, table, seconds):
+        with self._lock:
+            self.upserts.setdefault(table, Histogram()).observe(seconds)
+
+    def report(self, status="success"):
+        duration = perf_counter() - self._t0
+        return {
+            "status": status,
+            "started_at": datetime.fromtimestamp(self.started, timezone.utc).isoformat(),
+            "duration_s": round(duration, 3),
+            **self.info,
+            "stages": [s.as_dict() for s in list(self.stages.values())],
+            "upsert_latency": {table: h.as_dict() for table, h in self.upserts.items()},
+        }
+
+
+class InstrumentedCursor:
+    def __init__(self, cur, metrics):
+        self._cur = cur
+        self._metrics = metrics
+
+    def execute(self, *args, **kwargs):
+        result = self._cur.execute(*args, **kwargs)
+        # rowcount of a statement without a result set is the rows it affected.
+        self._metrics.count_sql(self._cur.rowcount if self._cur.description is None else 0)
+        return result
+
+    def executemany(self, *args, **kwargs):
+        result = self._cur.executemany(*args, **kwargs)
+        self._metrics.count_sql(self._cur.rowcount)
+        return result
+
+    def __iter__(self):
+        return iter(self._cur)
+
+    def __getattr__(self, name):
+        return getattr(self._cur, name)
+
+
+class InstrumentedConnection:
+    """DB-API connection wrapper feeding statement counts and rows affected into RunMetrics."""
+    def __init__(self, conn, metrics):
+        self._conn = conn
+        self._metrics = metrics
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self._conn.cursor(*args, **kwargs), self._metrics)
+
+    def commit(self):
+        self._conn.commit()
+        self._metrics.count_sql()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def _write_atomic(path, text):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def write_json_report(path, report):
+    _write_atomic(path, json.dumps(report, indent=2, default=str) + "\n")
+
+
+def _prom_number(value):
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+
+def write_prometheus_textfile(path, report, metrics):
+    """Write the run's metrics in the Prometheus text format (for node_exporter's textfile collector)."""
+    lines = []
+
+    def family(name, kind, help_text):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    family("etl_run_success", "gauge", "1 if the last ETL run succeeded, else 0.")
+    lines.append(f"etl_run_success {1 if report['status'] == 'success' else 0}")
+    family("etl_run_duration_seconds", "gauge", "Wall time of the last ETL run.")
+    lines.append(f"etl_run_duration_seconds {report['duration_s']}")
+    family("etl_run_timestamp_seconds", "gauge", "Start time of the last ETL run (Unix time).")
+    lines.append(f"etl_run_timestamp_seconds {metrics.started:.3f}")
+    for key, kind, help_text in (
+        ("seconds", "etl_stage_seconds", "Time spent in each ETL stage."),
+        ("rows", "etl_stage_rows", "Rows handled by each ETL stage."),
+        ("statements", "etl_stage_sql_statements", "SQL statements (and commits) sent by each ETL stage."),
+        ("rows_affected", "etl_stage_rows_affected", "Rows affected by the SQL of each ETL stage."),
+    ):
+        family(kind, "gauge", help_text)
+        for s in report["stages"]:
+            lines.append(f'{kind}{{stage="{s["stage"]}"}} {s[key]}')
+    family("etl_upsert_seconds", "histogram", "Latency of each bulk dimension/fact upsert.")
+    for table, h in metrics.upserts.items():
+        for bound, total in h.cumulative():
+            lines.append(f'etl_upsert_seconds_bucket{{table="{table}",le="{_prom_number(bound)}"}} {total}')
+        lines.append(f'etl_upsert_seconds_sum{{table="{table}"}} {h.sum:.6f}')
+        lines.append(f'etl_upsert_seconds_count{{table="{table}"}} {h.count}')
+    _write_atomic(path, "\n".join(lines) + "\n")
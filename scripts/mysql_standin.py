@@ -0,0 +1,279 @@
+"""
+In-process stand-in for a mysql.connector connection, backed by sqlite3.
+It translates only the MySQL dialect the ETL itself emits (AUTO_INCREMENT DDL,
+ON DUPLICATE KEY UPDATE, <=>, TRUNCATE, information_schema lookups, temporary
+tables, added CURRENT_TIMESTAMP columns and LOAD DATA LOCAL INFILE of TSV files),
+so bench_etl.py can run the whole pipeline without a database server. Throughput measured against it is for comparing ETL builds with
+each other, not for predicting MySQL timings.
+"""
+import os
+import re
+import sqlite3
+import threading
+from datetime import date
+from decimal import Decimal
+
+sqlite3.register_adapter(Decimal, float)
+sqlite3.register_adapter(date, date.isoformat)
+
+_REWRITES = [
+    (re.compile(r"\bBIGINT\s+AUTO_INCREMENT\s+PRIMARY\s+KEY", re.I), "INTEGER PRIMARY KEY AUTOINCREMENT"),
+    (re.compile(r"\bAUTO_INCREMENT\b", re.I), ""),
+    (re.compile(r"\)\s*ENGINE=\w+", re.I), ")"),
+    (re.compile(r"\bUNIQUE KEY \w+\s*\(", re.I), "UNIQUE ("),
+    (re.compile(r"\bPRIMARY KEY \w+\s*\(", re.I), "PRIMARY KEY ("),
+    (re.compile(r"\bON UPDATE CURRENT_TIMESTAMP\b", re.I), ""),
+    (re.compile(r"\bTRUNCATE TABLE (\w+)", re.I), r"DELETE FROM \1"),
+    (re.compile(r"\bINSERT IGNORE\b", re.I), "INSERT OR IGNORE"),
+    (re.compile(r"\bDROP TEMPORARY TABLE\b", re.I), "DROP TABLE"),
+    # sqlite needs a WHERE before the upsert clause of an INSERT ... SELECT.
+    (re.compile(r"(\bFROM \w+(?: (?!ON\b)\w+)?) (ON DUPLICATE KEY UPDATE)\b"), r"\1 WHERE true \2"),
+    (re.compile(r"\bON DUPLICATE KEY UPDATE\b", re.I), "ON CONFLICT DO UPDATE SET"),
+    (re.compile(r"\bVALUES\((\w+)\)"), r"excluded.\1"),
+    (re.compile(r"\bLAST_INSERT_ID\(\)"), "last_insert_rowid()"),
+    (re.compile(r"\binformation_schema\.(STATISTICS|COLUMNS)\b"), r"_is_\1"),
+    (re.compile(r"\bDATABASE\(\)"), "'main'"),
+    (re.compile(r"<=>"), " IS "),
+    (re.compile(r"%s"), "?"),
+]
+_OR_CHAIN = re.compile(r"\(([^()]*)\)(?: OR \(([^()]*)\))+")
+_UNION_CHAIN = re.compile(r"\((SELECT [^()]* UNION ALL [^()]*)\)")
+_MAX_COMPOUND = 500
+_LOAD_DATA = re.compile(r"^\s*LOAD DATA LOCAL INFILE .*?(REPLACE )?INTO TABLE (\w+).*\(([\w,]+)\)\s*$", re.I | re.S)
+_CREATE_LIKE = re.compile(r"^\s*CREATE TEMPORARY TABLE (\w+) LIKE (\w+)\s*$", re.I)
+_ADD_TIMESTAMP = re.compile(r"^\s*ALTER TABLE (\w+) ADD COLUMN (\w+) TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP"
+                            r"( ON UPDATE CURRENT_TIMESTAMP)?\s*$", re.I)
+_FOREIGN_KEY = re.compile(r",\s*CONSTRAINT \w+\s+FOREIGN KEY\s*\([^)]*\)\s*REFERENCES \w+\s*\([^)]*\)", re.I)
+_TSV_UNESCAPE = re.compile(r"\\(.)")
+_TSV_CHARS = {"t": "\t", "n": "\n", "r": "\r", "0": "\0"}
+
+# sqlite error messages -> the MySQL errno the ETL checks for.
+_ERRNOS = (
+    (re.compile(r"no such table"), 1146),
+    (re.compile(r"table \S+ already exists"), 1050),
+    (re.compile(r"index \S+ already exists"), 1061),
+)
+
+_VIEWS = (
+    # sqlite names UNIQUE constraints sqlite_autoindex_*; the fact table's is reported
+    # under the MySQL name the schema upgrade looks for.
+    "CREATE TEMP VIEW IF NOT EXISTS _is_STATISTICS AS SELECT 'main' AS TABLE_SCHEMA, m.name AS TABLE_NAME, "
+    "CASE WHEN m.name = 'fact_property_snapshot' AND il.origin = 'u' THEN 'uk_fact_snapshot' ELSE il.name END "
+    "AS INDEX_NAME FROM sqlite_master m, pragma_index_list(m.name) il WHERE m.type = 'table'",
+    "CREATE TEMP VIEW IF NOT EXISTS _is_COLUMNS AS SELECT 'main' AS TABLE_SCHEMA, m.name AS TABLE_NAME, "
+    "p.name AS COLUMN_NAME, p.type AS COLUMN_TYPE FROM sqlite_master m, pragma_table_info(m.name) p "
+    "WHERE m.type = 'table'",
+)
+
+
+def _balanced_or(terms):
+    if len(terms) == 1:
+        return f"({terms[0]})"
+    mid = len(terms) // 2
+    return f"({_balanced_or(terms[:mid])} OR {_balanced_or(terms[mid:])})"
+
+
+def _balance_or_chain(match):
+    # A chain of n ORs parses n levels deep; sqlite caps expression depth at 1000.
+    return _balanced_or(match.group(0)[1:-1].split(") OR ("))
+
+
+def _split_union_chain(match):
+    # sqlite caps a compound SELECT at 500 terms; longer chains are unioned in groups.
+    terms = match.group(1).split(" UNION ALL ")
+    if len(terms) <= _MAX_COMPOUND:
+        return match.group(0)
+    groups = [" UNION ALL ".join(terms[i:i + _MAX_COMPOUND]) for i in range(0, len(terms), _MAX_COMPOUND)]
+    return "(" + " UNION ALL ".join(f"SELECT * FROM ({g})" for g in groups) + ")"
+
+
+class DatabaseError(Exception):
+    """A sqlite error carrying the errno MySQL would report for it (None if unmapped)."""
+    def __init__(self, msg, errno=None):
+        super().__init__(msg)
+        self.errno = errno
+
+
+def _mysql_error(exc):
+    msg = str(exc)
+    errno = next((n for pattern, n in _ERRNOS if pattern.search(msg)), None)
+    return DatabaseError(msg, errno)
+
+
+def translate(sql):
+    """Rewrite one MySQL statement emitted by the ETL into sqlite syntax."""
+    for pattern, repl in _REWRITES:
+        sql = pattern.sub(repl, sql)
+    sql = _UNION_CHAIN.sub(_split_union_chain, sql)
+    return _OR_CHAIN.sub(_balance_or_chain, sql)
+
+
+class Cursor:
+    """Runs each statement under the handle's lock and buffers its result rows."""
+    def __init__(self, conn, dictionary=False):
+        self._handle = conn._handle
+        self.dictionary = dictionary
+        self.description = None
+        self.rowcount = -1
+        self.lastrowid = None
+        self._rows = []
+
+    def execute(self, sql, params=()):
+        load = _LOAD_DATA.match(sql)
+        like = _CREATE_LIKE.match(sql)
+        stamp = _ADD_TIMESTAMP.match(sql)
+        with self._handle.lock:
+            cur = self._handle.db.cursor()
+            try:
+                if load:
+                    self._load_data(cur, load.group(2), load.group(3).split(","), params[0], bool(load.group(1)))
+                    return
+                if like:
+                    self._create_like(cur, like.group(1), like.group(2))
+                    return
+                if stamp:
+                    self._add_timestamp(cur, stamp.group(1), stamp.group(2), bool(stamp.group(3)))
+                    return
+                cur.execute(translate(sql), tuple(params or ()))
+                self.description = cur.description
+                self._rows = cur.fetchall() if cur.description else []
+                self.rowcount = len(self._rows) if cur.description else cur.rowcount
+                self.lastrowid = cur.lastrowid
+            except sqlite3.OperationalError as e:
+                raise _mysql_error(e) from e
+            finally:
+                cur.close()
+
+    def executemany(self, sql, seq):
+        with self._handle.lock:
+            cur = self._handle.db.cursor()
+            try:
+                cur.executemany(translate(sql), [tuple(p) for p in seq])
+                self.description = None
+                self._rows = []
+                self.rowcount = cur.rowcount
+            except sqlite3.OperationalError as e:
+                raise _mysql_error(e) from e
+            finally:
+                cur.close()
+
+    def _load_data(self, cur, table, columns, path, replace=False):
+        unescape = lambda m: _TSV_CHARS.get(m.group(1), m.group(1))
+        field = lambda text: None if text == "\\N" else _TSV_UNESCAPE.sub(unescape, text)
+        with open(path, encoding="utf-8", newline="\n") as f:
+            rows = [tuple(field(text) for text in line.rstrip("\n").split("\t")) for line in f]
+        # LOAD DATA LOCAL skips rows with duplicate keys unless REPLACE is given.
+        cur.executemany(f"INSERT OR {'REPLACE' if replace else 'IGNORE'} INTO {table} ({','.join(columns)}) "
+                        f"VALUES ({','.join(['?'] * len(columns))})", rows)
+        self.description = None
+        self._rows = []
+        self.rowcount = len(rows)
+
+    def _create_like(self, cur, name, source):
+        # Like MySQL's CREATE TABLE ... LIKE: same columns and keys, no foreign keys.
+        cur.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (source,))
+        found = cur.fetchone()
+        if found is None:
+            raise DatabaseError(f"no such table: {source}", 1146)
+        ddl = _FOREIGN_KEY.sub("", found[0])
+        cur.execute(re.sub(r"^CREATE TABLE \S+", f"CREATE TEMP TABLE {name}", ddl, count=1))
+        self.description = None
+        self._rows = []
+        self.rowcount = 0
+
+    def _add_timestamp(self, cur, table, column, on_update):
+        # sqlite cannot add a column with a non-constant default; triggers stamp the rows
+        # instead, on insert and (for ON UPDATE CURRENT_TIMESTAMP) on every update.
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} TIMESTAMP")
+        cur.execute(f"UPDATE {table} SET {column} = CURRENT_TIMESTAMP")
+        cur.execute(f"CREATE TRIGGER {table}_{column}_insert AFTER INSERT ON {table} WHEN NEW.{column} IS NULL "
+                    f"BEGIN UPDATE {table} SET {column} = CURRENT_TIMESTAMP WHERE rowid = NEW.rowid; END")
+        if on_update:
+            cur.execute(f"CREATE TRIGGER {table}_{column}_update AFTER UPDATE ON {table} "
+                        f"BEGIN UPDATE {table} SET {column} = CURRENT_TIMESTAMP WHERE rowid = NEW.rowid; END")
+        self.description = None
+        self._rows = []
+        self.rowcount = 0
+
+    def _wrap(self, row):
+        if row is None or not self.dictionary:
+            return row
+        return {d[0]: v for d, v in zip(self.description, row)}
+
+    def fetchone(self):
+        return self._wrap(self._rows.pop(0) if self._rows else None)
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return [self._wrap(r) for r in rows]
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def close(self):
+        self._rows = []
+
+
+class _Handle:
+    def __init__(self, path):
+        self.db = sqlite3.connect(path, check_same_thread=False, timeout=60)
+        self.db.execute("PRAGMA foreign_keys=ON")
+        self.db.execute("PRAGMA journal_mode=WAL")
+        for view in _VIEWS:
+            self.db.execute(view)
+        self.lock = threading.RLock()
+        self.refs = 0
+
+
+_handles = {}
+_handles_lock = threading.Lock()
+
+
+class Connection:
+    """
+    A sqlite database file opened with the subset of the mysql.connector API the ETL uses.
+    All connections to one file share a single sqlite handle, and with it a single
+    transaction: statements from concurrent connections (pipelined change detection,
+    pooled parallel dimension loads) are serialized, like requests on one socket, and a
+    commit on any of them commits all their work. sqlite's one-writer locking would
+    otherwise make such connections wait on each other until they time out.
+    """
+    def __init__(self, path):
+        self._path = os.path.abspath(path)
+        with _handles_lock:
+            handle = _handles.get(self._path)
+            if handle is None:
+                handle = _handles[self._path] = _Handle(self._path)
+            handle.refs += 1
+        self._handle = handle
+
+    def cursor(self, dictionary=False, buffered=False, **kwargs):
+        return Cursor(self, dictionary)
+
+    def commit(self):
+        with self._handle.lock:
+            self._handle.db.commit()
+
+    def rollback(self):
+        with self._handle.lock:
+            self._handle.db.rollback()
+
+    def close(self):
+        if self._handle is None:
+            return
+        with _handles_lock:
+            self._handle.refs -= 1
+            if self._handle.refs == 0:
+                del _handles[self._path]
+                self._handle.db.close()
+        self._handle = None
+
+    def is_connected(self):
+        return self._handle is not None
+
+    def ping(self, reconnect=False, attempts=1, delay=0):
+        pass
+
+
+def connect(path):
+    return Connection(path)
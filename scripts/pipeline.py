@@ -0,0 +1,159 @@
+"""
+Pipelined execution for the ETL: read/parse, transform and load run concurrently,
+connected by bounded queues so a slow stage applies backpressure upstream.
+"""
+import queue
+import threading
+from time import perf_counter
+
+_DONE = object()
+_POLL_SECONDS = 0.1
+
+
+class _Failure:
+    def __init__(self, exc):
+        self.exc = exc
+
+
+class StageStats:
+    """Wall time of a stage split into busy time and time spent waiting on its queues."""
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.started = None
+        self.finished = None
+        self.wait_in = 0.0
+        self.wait_out = 0.0
+
+    @property
+    def wall(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or perf_counter()) - self.started
+
+    @property
+    def busy(self):
+        return max(self.wall - self.wait_in - self.wait_out, 0.0)
+
+    def as_dict(self):
+        return {
+            "stage": self.name,
+            "items": self.items,
+            "wall_s": round(self.wall, 3),
+            "busy_s": round(self.busy, 3),
+            "waiting_for_input_s": round(self.wait_in, 3),
+            "blocked_on_output_s": round(self.wait_out, 3),
+        }
+
+
+class Pipeline:
+    """
+    Iterate over transform(source) while reading and transforming run on background threads.
+
+    ``source`` is an iterable of work items (record chunks) and is consumed on the read
+    thread, so file I/O and JSON decoding happen there. ``transform`` maps an iterable of
+    items to an iterable of results and runs on the transform thread. The caller iterates
+    the pipeline on its own thread as the load stage. Queues hold at most ``queue_size``
+    items each, so a slow loader stalls transforming and reading instead of letting
+    queued chunks grow without bound.
+    """
+    def __init__(self, source, transform, queue_size=4):
+        self._source = source
+        self._transform = transform
+        self._parsed = queue.Queue(maxsize=queue_size)
+        self._transformed = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._threads = []
+        self.stats = {name: StageStats(name) for name in ("read", "transform", "load")}
+
+    def _put(self, q, item, stats):
+        t0 = perf_counter()
+        try:
+            while not self._stop.is_set():
+                try:
+                    q.put(item, timeout=_POLL_SECONDS)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        finally:
+            stats.wait_out += perf_counter() - t0
+
+    def _get(self, q, stats):
+        t0 = perf_counter()
+        try:
+            while True:
+                try:
+                    return q.get(timeout=_POLL_SECONDS)
+                except queue.Empty:
+                    if self._stop.is_set():
+                        return _DONE
+        finally:
+            stats.wait_in += perf_counter() - t0
+
+    def _drain(self, q, stats):
+        while True:
+            item = self._get(q, stats)
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.exc
+            stats.items += 1
+            yield item
+
+    def _run_read(self):
+        stats = self.stats["read"]
+        stats.started = perf_counter()
+        try:
+            for item in self._source:
+                stats.items += 1
+                if not self._put(self._parsed, item, stats):
+                    return
+            self._put(self._parsed, _DONE, stats)
+        except BaseException as e:
+            self._put(self._parsed, _Failure(e), stats)
+        finally:
+            stats.finished = perf_counter()
+
+    def _run_transform(self):
+        stats = self.stats["transform"]
+        stats.started = perf_counter()
+        try:
+            for result in self._transform(self._drain(self._parsed, stats)):
+                if not self._put(self._transformed, result, stats):
+                    return
+            self._put(self._transformed, _DONE, stats)
+        except BaseException as e:
+            self._put(self._transformed, _Failure(e), stats)
+        finally:
+            stats.finished = perf_counter()
+
+    def __iter__(self):
+        for target in (self._run_read, self._run_transform):
+            t = threading.Thread(target=target, name=f"etl-{target.__name__[5:]}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        stats = self.stats["load"]
+        stats.started = perf_counter()
+        try:
+            # Time outside _get() is the caller's load work, counted as busy.
+            yield from self._drain(self._transformed, stats)
+        finally:
+            stats.finished = perf_counter()
+
+    def close(self):
+        """Stop the background stages and wait for them to exit."""
+        self._stop.set()
+        for t in self._threads:
+            t.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def report(self):
+        """Per-stage timing lines; the stage with the least waiting is the bottleneck."""
+        return [s.as_dict() for s in self.stats.values()]
@@ -0,0 +1,152 @@
+"""
+Seeded generator of synthetic property feeds in the shape etl.py consumes: flat
+property/address/tax fields plus nested Valuation, HOA and Rehab lists, with the
+messy numeric strings of the real feed ("$1,250", "1,850 sqft", " 2.5 ", "").
+The same seed, count and options always produce the same file.
+
+    python synthetic.py 100000 ../data/synthetic_100k.jsonl --seed 42
+"""
+import os
+import sys
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import jsoncodec
+
+CITIES = [
+    ("Austin", "TX", "787"), ("Dallas", "TX", "752"), ("Houston", "TX", "770"),
+    ("Phoenix", "AZ", "850"), ("Tucson", "AZ", "857"), ("Tampa", "FL", "336"),
+    ("Orlando", "FL", "328"), ("Atlanta", "GA", "303"), ("Charlotte", "NC", "282"),
+    ("Nashville", "TN", "372"), ("Columbus", "OH", "432"), ("Indianapolis", "IN", "462"),
+]
+STREETS = ["Oak", "Maple", "Cedar", "Pine", "Elm", "Lake", "Hill", "Park", "Sunset", "Ridge",
+           "Washington", "Lincoln", "Jackson", "Willow", "Meadow", "Forest"]
+SUFFIXES = ["St", "Ave", "Dr", "Ln", "Ct", "Blvd", "Way", "Rd"]
+PROPERTY_TYPES = ["Single Family", "Condo", "Townhouse", "Multi-Family", "Mobile Home"]
+REHAB_FLAGS = ("Roof_Flag", "Windows_Flag", "Kitchen_Flag", "Bathroom_Flag", "Paint",
+               "HVAC_Flag", "Foundation_Flag")
+YES_NO = ["Yes", "No", "yes", "NO", " Yes ", ""]
+
+
+def _money(rng, lo, hi, empty=0.05):
+    """A dollar amount as an int or in one of the feed's string spellings."""
+    r = rng.random()
+    if r < empty:
+        return rng.choice(["", " ", None])
+    value = rng.randint(lo, hi)
+    r = rng.random()
+    if r < 0.35:
+        return value
+    if r < 0.6:
+        return f"${value:,}"
+    if r < 0.8:
+        return f"{value:,}"
+    if r < 0.9:
+        return f" {value}.00 "
+    return str(value)
+
+
+def _valuation(rng, base):
+    entry = {}
+    for key, share in (("Redfin_Value", 0.4), ("Zestimate", 0.7), ("ARV", 0.3), ("List_Price", 0.5)):
+        if rng.random() < share:
+            entry[key] = _money(rng, int(base * 0.8), int(base * 1.25))
+    rent = rng.randint(800, 3500)
+    entry["Low_FMR"] = _money(rng, int(rent * 0.85), rent)
+    entry["High_FMR"] = _money(rng, rent, int(rent * 1.2))
+    return entry
+
+
+def _hoa(rng):
+    if rng.random() < 0.3:
+        return {"HOA": rng.choice(["", " ", None]), "HOA_Flag": "No"}
+    return {"HOA": _money(rng, 25, 750, empty=0.1), "HOA_Flag": rng.choice(["Yes", "yes", "Yes "])}
+
+
+def _rehab(rng):
+    entry = {
+        "Underwriting_Rehab": _money(rng, 2000, 90000, empty=0.2),
+        "Rehab_Calculation": _money(rng, 2000, 90000, empty=0.35),
+    }
+    for flag in REHAB_FLAGS:
+        if rng.random() < 0.85:
+            entry[flag] = rng.choice(YES_NO)
+    return entry
+
+
+def synthetic_record(rng, i):
+    """One property record; i makes the street address unique."""
+    city, state, zip3 = rng.choice(CITIES)
+    street = f"{100 + i} {rng.choice(STREETS)} {rng.choice(SUFFIXES)}"
+    base = rng.randint(80, 1200) * 1000
+    sqft = rng.randint(600, 5200)
+    zip_code = f"{zip3}{rng.randint(0, 99):02d}"
+    return {
+        "Property_Title": f"{street}, {city}, {state} {zip_code}",
+        "Street_Address": street,
+        "City": city,
+        "State": state,
+        "Zip": zip_code,
+        "Property_Type": rng.choice(PROPERTY_TYPES),
+        "Year_Built": rng.randint(1900, 2023),
+        "SQFT_Total": rng.choice([sqft, f"{sqft:,}", f"{sqft:,} sqft", f"{sqft} SqFt", ""]),
+        "Bed": rng.choice([rng.randint(1, 6), str(rng.randint(1, 6)), f" {rng.randint(1, 6)} "]),
+        "Bath": rng.choice([1, 1.5, 2, "2.5", " 3 ", "3.5", None]),
+        "Latitude": round(rng.uniform(25.0, 45.0), 6),
+        "Longitude": rng.choice([round(rng.uniform(-120.0, -75.0), 6), f"{rng.uniform(-120.0, -75.0):.5f}"]),
+        "Taxes": _money(rng, 400, 18000, empty=0.1),
+        "Valuation": [_valuation(rng, base) for _ in range(rng.randint(0, 3))],
+        "HOA": [_hoa(rng) for _ in range(rng.choice([0, 1, 1, 1, 2]))],
+        "Rehab": [_rehab(rng) for _ in range(rng.choice([0, 1, 1, 2]))],
+    }
+
+
+def generate_records(n, seed=42, repeat_rate=0.02):
+    """
+    Yield n records. A repeat_rate share of them re-send an earlier property (same
+    address, fresh values), as feeds do when a listing is updated.
+    """
+    rng = random.Random(seed)
+    for i in range(n):
+        if i and rng.random() < repeat_rate:
+            j = rng.randrange(i)
+            rec = synthetic_record(rng, j)
+            again = synthetic_record(random.Random(f"{seed}:{j}"), j)
+            for field in ("Street_Address", "City", "State", "Zip", "Property_Title"):
+                rec[field] = again[field]
+        else:
+            rec = synthetic_record(random.Random(f"{seed}:{i}"), i)
+        yield rec
+
+
+def write_feed(path, n, seed=42, repeat_rate=0.02):
+    """Write n records to path: JSONL when it ends in .jsonl, else a JSON array."""
+    records = generate_records(n, seed, repeat_rate)
+    with open(path, "w", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for rec in records:
+                f.write(jsoncodec.dumps(rec) + "\n")
+        else:
+            f.write("[\n")
+            for i, rec in enumerate(records):
+                f.write((",\n" if i else "") + jsoncodec.dumps(rec))
+            f.write("\n]\n")
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic property feed.")
+    parser.add_argument("records", type=int, help="Number of records to generate")
+    parser.add_argument("path", help="Output file; .jsonl writes one record per line, anything else a JSON array")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat-rate", type=float, default=0.02,
+                        help="Share of records re-sending an earlier property (default 0.02)")
+    args = parser.parse_args(argv)
+    write_feed(args.path, args.records, args.seed, args.repeat_rate)
+    print(f"Wrote {args.records} records to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
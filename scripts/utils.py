@@ -1,8 +1,10 @@
-import os, hashlib
+import os, re, hashlib, tempfile, queue, threading
+from collections import OrderedDict
+from contextlib import contextmanager
 import mysql.connector as mysql
 from dateutil.parser import parse as dtparse
 
-def get_conn():
+def get_conn(infile_dir=None):
     return mysql.connect(
         host=os.environ["MYSQL_HOST"],
         port=int(os.environ.get("MYSQL_PORT", "3306")),
@@ -10,8 +12,67 @@ def get_conn():
         user=os.environ["MYSQL_USER"],
         password=os.environ["MYSQL_PASSWORD"],
         autocommit=False,
+        # LOAD DATA LOCAL INFILE is only allowed for staging files in the temp directory
+        # (or, for import_sink.py, the directory of the files being imported).
+        allow_local_infile_in_path=infile_dir or tempfile.gettempdir(),
     )
 
+class ConnectionPool:
+    """
+    Fixed-size pool of connections opened lazily by factory (get_conn by default).
+    Threads borrow one with `with pool.connection() as conn:`; it is rolled back if the
+    block raises and returned to the pool either way, so a borrower never sees another
+    borrower's open transaction. connection() blocks while all size connections are out.
+    """
+    def __init__(self, size, factory=None):
+        self.size = size
+        self._factory = factory or get_conn
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._opened = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self):
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._factory()
+                with self._lock:
+                    self._opened.append(conn)
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """Close every connection the pool opened."""
+        with self._lock:
+            opened, self._opened = self._opened, []
+        for conn in opened:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+def get_pool(size):
+    """Pool of up to size connections with get_conn()'s settings."""
+    return ConnectionPool(size, get_conn)
+
 def dict_get(d, dotted, default=None):
     cur = d
     for part in dotted.split("."):
@@ -29,6 +90,20 @@ def hash_key(parts):
     s = "|".join([str(p).strip().lower() if p is not None else "" for p in parts])
     return hashlib.sha256(s.encode("utf-8")).hexdigest()
 
+def file_fingerprint(path, bufsize=1 << 20):
+    """Identity of an input file: absolute path, size in bytes and SHA-256 of its content."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(bufsize), b""):
+            h.update(block)
+    return {
+        "source_path": os.path.abspath(path),
+        "source_size": os.path.getsize(path),
+        "source_sha256": h.hexdigest(),
+    }
+
+_NON_NUMERIC = re.compile(r'[^\d.-]')
+
 def parse_number(value):
     """
     Parse numeric value from various formats.
@@ -43,8 +118,7 @@ def parse_number(value):
         value = value.strip()
         if value == "" or value.lower() == "null":
             return None
-        import re
-        cleaned = re.sub(r'[^\d.-]', '', value.replace(',', ''))
+        cleaned = _NON_NUMERIC.sub('', value.replace(',', ''))
         if cleaned == "" or cleaned == "-" or cleaned == ".":
             return None
         try:
@@ -52,4 +126,37 @@ def parse_number(value):
             return int(result) if result.is_integer() else result
         except (ValueError, AttributeError):
             return None
-    return None
\ No newline at end of file
+    return None
+
+class LRUCache:
+    """
+    Bounded mapping with least-recently-used eviction.
+    Counts hits and misses of get() so callers can size it.
+    """
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        if key in self._data:
+            self._data.move_to_end(key)
+            self.hits += 1
+            return self._data[key]
+        self.misses += 1
+        return default
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
@@ -1,202 +1,569 @@
 """
 Validation script for ETL pipeline.
 Runs data quality checks and generates a summary report.
+
+Each check is registered by name in CHECKS and runs on its own pooled connection,
+concurrently with the others and under a time limit, so validation takes about as
+long as its slowest check. Row counts come from the running totals the ETL keeps in
+etl_table_totals, and the integrity checks cover only the staged and fact rows added
+since the last clean validation (the watermark in etl_validation_watermark), plus the
+facts updated in place since then (by fact_property_snapshot.updated_at). --full
+counts and checks every row instead, and also verifies the running totals.
+
+    python validate.py --json ../logs/validation.json
+
+The sample preview reads fact_property_current and the summary statistics read
+agg_property_summary, both kept up to date by the ETL.
+The exit status is 1 unless every check passes (or is skipped).
 """
 import os
+import re
 import sys
+import json
+import argparse
+from concurrent.futures import ThreadPoolExecutor, wait
+from time import perf_counter
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from utils import get_conn
+from aggregates import (SUMMARY_TABLE, SUMMARY_FROM_STAR_SQL, GROUP_COLUMNS, ROLLUP_COLUMNS, amount, fold_text,
+                        CURRENT_TABLE, CURRENT_FROM_STAR_SQL, SNAPSHOT_KEYS)
+from etl import _NO_SUCH_TABLE, COUNTED_TABLES, TOTALS_TABLE, WATERMARK_TABLE
+from utils import get_pool
+
+# MySQL errno of a SELECT stopped by its MAX_EXECUTION_TIME.
+_QUERY_TIMEOUT = 3024
+
+DEFAULT_CONNECTIONS = 4
+DEFAULT_TIMEOUT = 60.0
+# Extra seconds the runner waits for checks past their limits before giving up on them.
+TIMEOUT_GRACE = 5.0
+
+# Tables whose new rows are checked incrementally; the watermark is their last checked id.
+WATERMARKED_TABLES = ("stg_properties_raw", "fact_property_snapshot")
+DIMENSION_TABLES = ("dim_property", "dim_address", "dim_hoa", "dim_valuation", "dim_rehab", "dim_tax")
+
+_SELECT = re.compile(r"^\s*SELECT\b", re.I)
+
+
+class CheckResult:
+    """Outcome of one check: its report lines, the issues it found and values for the JSON report."""
+    def __init__(self, name):
+        self.name = name
+        self.status = "pass"
+        self.seconds = 0.0
+        self.lines = []
+        self.issues = []
+        self.values = {}
+
+    def say(self, line):
+        self.lines.append(line)
+
+    def fail(self, issue):
+        self.status = "fail"
+        self.issues.append(issue)
+
+    def skip(self, reason):
+        self.status = "skipped"
+        self.say(f"  Skipped: {reason}")
+
+    def as_dict(self):
+        return {
+            "name": self.name,
+            "status": self.status,
+            "seconds": round(self.seconds, 3),
+            "issues": self.issues,
+            "values": self.values,
+        }
+
+
+class Check:
+    def __init__(self, name, section, fn, timeout=None):
+        self.name = name
+        self.section = section
+        self.fn = fn
+        self.timeout = timeout
+
+
+# Registered checks, in report order.
+CHECKS = []
+
+def check(name, section, timeout=None):
+    """
+    Register fn(cur, ctx, result) as a check named name, reported under section.
+    timeout overrides the run's per-check limit (seconds).
+    """
+    def register(fn):
+        CHECKS.append(Check(name, section, fn, timeout))
+        return fn
+    return register
+
+
+class TimeLimitedCursor:
+    """Adds a MAX_EXECUTION_TIME hint to every SELECT, so the server stops a check that overruns."""
+    def __init__(self, cur, seconds):
+        self._cur = cur
+        self._hint = f"SELECT /*+ MAX_EXECUTION_TIME({max(int(seconds * 1000), 1)}) */"
+
+    def execute(self, sql, *args, **kwargs):
+        return self._cur.execute(_SELECT.sub(self._hint, sql, count=1), *args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._cur, name)
+
+
+def read_totals(cur):
+    """{table: (row_count, max_id)} from etl_table_totals, or None if the ETL has not created it yet."""
+    try:
+        cur.execute(f"SELECT table_name, row_count, max_id FROM {TOTALS_TABLE}")
+    except Exception as e:
+        if getattr(e, "errno", None) != _NO_SUCH_TABLE:
+            raise
+        return None
+    totals = {table: (0, 0) for table in COUNTED_TABLES}
+    for row in cur.fetchall():
+        totals[row["table_name"]] = (int(row["row_count"]), int(row["max_id"]))
+    return totals
+
+def read_watermarks(cur):
+    """{table: (last checked id, newest updated_at checked or None)}."""
+    cur.execute(f"SELECT table_name, last_id, last_updated_at FROM {WATERMARK_TABLE}")
+    marks = {table: (0, None) for table in WATERMARKED_TABLES}
+    marks.update({row["table_name"]: (int(row["last_id"]), row["last_updated_at"]) for row in cur.fetchall()})
+    return marks
+
+def save_watermarks(conn, marks):
+    cur = conn.cursor()
+    cur.execute(f"INSERT INTO {WATERMARK_TABLE} (table_name, last_id, last_updated_at) VALUES "
+                + ",".join(["(%s,%s,%s)"] * len(marks))
+                + " ON DUPLICATE KEY UPDATE last_id = VALUES(last_id), last_updated_at = VALUES(last_updated_at)",
+                [v for table, mark in marks.items() for v in (table, *mark)])
+    cur.close()
+    conn.commit()
+
+def max_id(cur, table):
+    id_col = COUNTED_TABLES[table]
+    cur.execute(f"SELECT COALESCE(MAX({id_col}), 0) AS max_id FROM {table}")
+    return int(cur.fetchone()["max_id"])
+
+def prepare(conn, full):
+    """
+    Shared inputs of the checks: the mode, the running totals, the id range of each
+    watermarked table to check and, for the facts, which are upserted in place, the
+    updated_at from which rows are checked again. Rows up to the current max ids are
+    checked now; later ones wait for the next run. The newest updated_at seen now is
+    the next run's starting point: the ETL is the tables' single writer, so rows of a
+    load that has not committed yet are stamped no earlier than it.
+    """
+    cur = conn.cursor(dictionary=True, buffered=True)
+    totals = read_totals(cur)
+    if totals is None and not full:
+        print("\n  No running totals yet (run etl.py to create them); running a full validation")
+        full = True
+    cur.execute("SELECT MAX(updated_at) AS updated_at FROM fact_property_snapshot")
+    updated_to = cur.fetchone()["updated_at"]
+    if full:
+        ranges = {table: (0, max_id(cur, table)) for table in WATERMARKED_TABLES}
+        updated_since = None
+    else:
+        marks = read_watermarks(cur)
+        ranges = {table: (marks[table][0], totals[table][1]) for table in WATERMARKED_TABLES}
+        updated_since = marks["fact_property_snapshot"][1]
+        if updated_since is None:
+            # No updated_at covered yet (first run after the column was added): check every fact once.
+            ranges["fact_property_snapshot"] = (0, totals["fact_property_snapshot"][1])
+    cur.close()
+    return {"full": full, "totals": totals, "ranges": ranges, "updated_since": updated_since,
+            "updated_to": updated_to}
+
+def fact_scope(ctx, alias="fact_property_snapshot"):
+    """WHERE condition and params selecting the facts to check: new ids and rows updated since the watermark."""
+    low, high = ctx["ranges"]["fact_property_snapshot"]
+    return (f"({alias}.snapshot_id > %s AND {alias}.snapshot_id <= %s OR {alias}.updated_at >= %s)",
+            (low, high, ctx["updated_since"]))
+
+def table_count(cur, ctx, table, result):
+    """Row count of table: its running total, or in full mode a scan checked against the total."""
+    totals = ctx["totals"]
+    if not ctx["full"]:
+        count = totals[table][0]
+    else:
+        cur.execute(f"SELECT COUNT(*) AS count FROM {table}")
+        count = int(cur.fetchone()["count"])
+        if totals is not None and totals[table][0] != count:
+            result.fail(f"Running total of {table} is {totals[table][0]}, table has {count} rows")
+    result.values["count"] = count
+    return count
+
+
+@check("raw_records", "Raw Records Staging")
+def check_raw_records(cur, ctx, result):
+    raw_count = table_count(cur, ctx, "stg_properties_raw", result)
+    result.say(f"  Raw records in staging: {raw_count}")
+    cur.execute("SELECT COUNT(*) AS count FROM stg_properties_raw WHERE stg_id > %s AND stg_id <= %s",
+                ctx["ranges"]["stg_properties_raw"])
+    checked = int(cur.fetchone()["count"])
+    result.values["checked"] = checked
+    result.say(f"  Checked in this run: {checked}")
+    if raw_count == 0:
+        # import_sink.py writes no staging rows; an imported input is the warehouse's record of its load.
+        cur.execute("SELECT COUNT(*) AS count FROM etl_checkpoint WHERE status = 'imported'")
+        if int(cur.fetchone()["count"]):
+            result.skip("staging is empty and the warehouse was loaded by import_sink.py, which stages no raw records")
+        else:
+            result.fail("No raw records found in staging table")
+
+def _dimension_count(table):
+    def check_dimension(cur, ctx, result):
+        result.say(f"  {table}: {table_count(cur, ctx, table, result)} records")
+    return check_dimension
 
-def run_validation():
-    """Run validation queries and print results."""
+for _table in DIMENSION_TABLES:
+    check(f"{_table}_count", "Dimension Table Counts")(_dimension_count(_table))
+
+@check("fact_records", "Fact Table")
+def check_fact_records(cur, ctx, result):
+    fact_count = table_count(cur, ctx, "fact_property_snapshot", result)
+    result.say(f"  Fact records: {fact_count}")
+    if fact_count == 0:
+        result.fail("No fact records found")
+
+@check("missing_addresses", "Data Integrity Checks")
+def check_missing_addresses(cur, ctx, result):
+    scope, params = fact_scope(ctx)
+    cur.execute(f"""
+        SELECT COUNT(*) AS count
+        FROM fact_property_snapshot
+        WHERE address_sk IS NULL AND {scope}
+    """, params)
+    bad_addr = result.values["count"] = int(cur.fetchone()["count"])
+    result.say(f"  Missing addresses: {bad_addr} (should be 0)")
+    if bad_addr > 0:
+        result.fail(f"{bad_addr} fact records with missing addresses")
+
+@check("missing_properties", "Data Integrity Checks")
+def check_missing_properties(cur, ctx, result):
+    scope, params = fact_scope(ctx, "fps")
+    cur.execute(f"""
+        SELECT COUNT(*) AS count
+        FROM fact_property_snapshot fps
+        LEFT JOIN dim_property p ON p.property_sk = fps.property_sk
+        WHERE p.property_sk IS NULL AND {scope}
+    """, params)
+    bad_prop = result.values["count"] = int(cur.fetchone()["count"])
+    result.say(f"  Missing properties: {bad_prop} (should be 0)")
+    if bad_prop > 0:
+        result.fail(f"{bad_prop} fact records with missing properties")
+
+@check("valuation_mismatches", "Data Integrity Checks")
+def check_valuation_mismatches(cur, ctx, result):
+    scope, params = fact_scope(ctx, "fps")
+    cur.execute(f"""
+        SELECT COUNT(*) AS count
+        FROM fact_property_snapshot fps
+        LEFT JOIN dim_valuation v ON v.valuation_sk = fps.valuation_sk
+        WHERE (fps.valuation_sk IS NOT NULL) AND (v.provider IS NULL)
+          AND {scope}
+    """, params)
+    val_mismatch = result.values["count"] = int(cur.fetchone()["count"])
+    result.say(f"  Valuation mismatches: {val_mismatch} (should be 0)")
+    if val_mismatch > 0:
+        result.fail(f"{val_mismatch} valuation foreign key mismatches")
+
+@check("sample_preview", "Sample Data Preview")
+def check_sample_preview(cur, ctx, result):
+    cur.execute(f"""
+        SELECT property_type, square_feet, city, state, valuation_estimate AS valuation, tax_amount
+        FROM {CURRENT_TABLE}
+        LIMIT 5
+    """)
+    samples = cur.fetchall()
+    result.values["samples"] = len(samples)
+    for i, sample in enumerate(samples, 1):
+        result.say(f"\n  Sample {i}:")
+        result.say(f"    Type: {sample['property_type']}")
+        result.say(f"    Square Feet: {sample['square_feet']}")
+        result.say(f"    Location: {sample['city']}, {sample['state']}")
+        result.say(f"    Valuation: ${sample['valuation']:,.2f}" if sample['valuation'] else "    Valuation: N/A")
+        result.say(f"    Tax: ${sample['tax_amount']:,.2f}" if sample['tax_amount'] else "    Tax: N/A")
+
+@check("properties_by_type", "Summary Statistics")
+def check_properties_by_type(cur, ctx, result):
+    cur.execute(f"""
+        SELECT property_type, SUM(property_count) AS count
+        FROM {SUMMARY_TABLE}
+        WHERE property_type <> ''
+        GROUP BY property_type
+        ORDER BY count DESC
+    """)
+    prop_types = cur.fetchall()
+    result.values["by_type"] = {pt["property_type"]: int(pt["count"]) for pt in prop_types}
+    result.say("\n  Properties by Type:")
+    for pt in prop_types:
+        result.say(f"    {pt['property_type']}: {pt['count']}")
+
+@check("top_states", "Summary Statistics")
+def check_top_states(cur, ctx, result):
+    cur.execute(f"""
+        SELECT state, SUM(property_count) AS count
+        FROM {SUMMARY_TABLE}
+        WHERE state <> ''
+        GROUP BY state
+        ORDER BY count DESC
+        LIMIT 10
+    """)
+    states = cur.fetchall()
+    result.values["top_states"] = {state["state"]: int(state["count"]) for state in states}
+    result.say("\n  Top 10 States by Property Count:")
+    for state in states:
+        result.say(f"    {state['state']}: {state['count']}")
+
+@check("valuation_stats", "Summary Statistics")
+def check_valuation_stats(cur, ctx, result):
+    cur.execute(f"""
+        SELECT
+            COALESCE(SUM(valuation_count), 0) AS count,
+            SUM(valuation_sum) / SUM(valuation_count) AS avg_estimate,
+            MIN(valuation_min) AS min_estimate,
+            MAX(valuation_max) AS max_estimate
+        FROM {SUMMARY_TABLE}
+    """)
+    val_stats = cur.fetchone()
+    result.values.update({k: (float(v) if v is not None else None) for k, v in val_stats.items()})
+    if val_stats['count'] > 0:
+        result.say("\n  Valuation Statistics:")
+        result.say(f"    Count: {val_stats['count']}")
+        result.say(f"    Average: ${val_stats['avg_estimate']:,.2f}")
+        result.say(f"    Min: ${val_stats['min_estimate']:,.2f}")
+        result.say(f"    Max: ${val_stats['max_estimate']:,.2f}")
+
+@check("tax_hoa_stats", "Summary Statistics")
+def check_tax_hoa_stats(cur, ctx, result):
+    cur.execute(f"""
+        SELECT
+            COALESCE(SUM(property_count), 0) AS properties,
+            COALESCE(SUM(tax_count), 0) AS tax_count,
+            SUM(tax_sum) / SUM(tax_count) AS avg_tax,
+            COALESCE(SUM(hoa_count), 0) AS hoa_count,
+            SUM(hoa_fee_sum) / SUM(hoa_count) AS avg_hoa_fee
+        FROM {SUMMARY_TABLE}
+    """)
+    stats = cur.fetchone()
+    result.values.update({k: (float(v) if v is not None else None) for k, v in stats.items()})
+    if stats['tax_count'] > 0:
+        result.say("\n  Tax Statistics:")
+        result.say(f"    Properties with tax: {stats['tax_count']} of {stats['properties']}")
+        result.say(f"    Average: ${stats['avg_tax']:,.2f}")
+    if stats['hoa_count'] > 0:
+        result.say("\n  HOA Statistics:")
+        result.say(f"    Properties with an HOA fee: {stats['hoa_count']} of {stats['properties']}")
+        result.say(f"    Average monthly fee: ${stats['avg_hoa_fee']:,.2f}")
+
+@check("property_summary", "Summary Statistics")
+def check_property_summary(cur, ctx, result):
+    if not ctx["full"]:
+        result.skip("recomputing the summary from the star schema runs with --full")
+        return
+
+    def rollups(rows):
+        out = {}
+        for row in rows:
+            key = tuple(fold_text(row[c]) for c in GROUP_COLUMNS)
+            out[key] = tuple(int(row[c]) if c.endswith("_count") else amount(row[c]) for c in ROLLUP_COLUMNS)
+        return out
+
+    cur.execute(SUMMARY_FROM_STAR_SQL)
+    expected = rollups(cur.fetchall())
+    cur.execute(f"SELECT {','.join(GROUP_COLUMNS + ROLLUP_COLUMNS)} FROM {SUMMARY_TABLE}")
+    stored = rollups(cur.fetchall())
+    drifted = sorted(key for key in set(expected) | set(stored) if expected.get(key) != stored.get(key))
+    result.values.update({"groups": len(expected), "drifted": len(drifted)})
+    result.say(f"\n  {SUMMARY_TABLE}: {len(expected)} groups, {len(drifted)} differ from the star schema (should be 0)")
+    if drifted:
+        result.fail(f"{len(drifted)} {SUMMARY_TABLE} groups differ from the star schema, e.g. {drifted[0]}")
+
+@check("current_snapshot", "Data Integrity Checks")
+def check_current_snapshot(cur, ctx, result):
+    if not ctx["full"]:
+        result.skip("recomputing the current snapshots from the star schema runs with --full")
+        return
+    columns = ("property_sk", "property_type", "effective_date", *SNAPSHOT_KEYS)
+
+    def snapshots(rows):
+        return {row["property_sk"]: tuple(str(row[c]) for c in columns) for row in rows}
+
+    cur.execute(CURRENT_FROM_STAR_SQL)
+    expected = snapshots(cur.fetchall())
+    cur.execute(f"SELECT {','.join(columns)} FROM {CURRENT_TABLE}")
+    stored = snapshots(cur.fetchall())
+    drifted = sorted(sk for sk in set(expected) | set(stored) if expected.get(sk) != stored.get(sk))
+    result.values.update({"properties": len(expected), "drifted": len(drifted)})
+    result.say(f"\n  {CURRENT_TABLE}: {len(expected)} properties, {len(drifted)} differ from the star schema (should be 0)")
+    if drifted:
+        result.fail(f"{len(drifted)} {CURRENT_TABLE} rows differ from the star schema, e.g. property_sk {drifted[0]}")
+
+
+def run_check(pool, chk, ctx, timeout):
+    """Run one check on a pooled connection; errors and timeouts become its result."""
+    result = CheckResult(chk.name)
+    limit = chk.timeout or timeout
+    t0 = perf_counter()
+    try:
+        with pool.connection() as conn:
+            cur = TimeLimitedCursor(conn.cursor(dictionary=True, buffered=True), limit)
+            try:
+                chk.fn(cur, ctx, result)
+            finally:
+                cur.close()
+    except Exception as e:
+        if getattr(e, "errno", None) == _QUERY_TIMEOUT:
+            result.status = "timeout"
+            result.issues.append(f"{chk.name} exceeded its {limit:g}s limit")
+        else:
+            result.status = "error"
+            result.issues.append(f"{chk.name} failed: {e}")
+    result.seconds = perf_counter() - t0
+    return result
+
+def run_checks(pool, checks, ctx, connections, timeout):
+    """
+    Run checks concurrently on up to connections pooled connections and return their
+    results in registration order. The server enforces each check's limit; a check
+    still running well past every limit is reported as timed out and abandoned.
+    """
+    executor = ThreadPoolExecutor(max_workers=connections, thread_name_prefix="validate")
+    futures = [executor.submit(run_check, pool, chk, ctx, timeout) for chk in checks]
+    waves = -(-len(checks) // connections)
+    deadline = max(chk.timeout or timeout for chk in checks) * waves + TIMEOUT_GRACE
+    wait(futures, timeout=deadline)
+    results = []
+    for chk, future in zip(checks, futures):
+        if future.done():
+            results.append(future.result())
+        else:
+            result = CheckResult(chk.name)
+            result.status = "timeout"
+            result.seconds = deadline
+            result.issues.append(f"{chk.name} did not finish within {deadline:g}s")
+            results.append(result)
+    executor.shutdown(wait=False, cancel_futures=True)
+    return results
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Validate the loaded star schema.")
+    parser.add_argument("--full", action="store_true",
+                        help="count and check every row instead of only rows added since the last validation")
+    parser.add_argument("--connections", type=int, default=DEFAULT_CONNECTIONS,
+                        help=f"checks run concurrently, each on its own connection (default {DEFAULT_CONNECTIONS})")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                        help=f"time limit per check in seconds (default {DEFAULT_TIMEOUT:g})")
+    parser.add_argument("--checks", nargs="+", metavar="NAME",
+                        help="run only these checks (default: all; see --list)")
+    parser.add_argument("--list", action="store_true", help="list the registered checks and exit")
+    parser.add_argument("--json", metavar="PATH",
+                        help="also write the machine-readable pass/fail report as JSON to PATH")
+    return parser.parse_args(argv)
+
+def run_validation(full=False, connections=DEFAULT_CONNECTIONS, timeout=DEFAULT_TIMEOUT, names=None, json_path=None):
+    """Run the registered checks (or those in names), print the report and return True if all passed."""
+    checks = [chk for chk in CHECKS if not names or chk.name in names]
+    unknown = set(names or ()) - {chk.name for chk in CHECKS}
+    if unknown:
+        raise SystemExit(f"Unknown checks: {', '.join(sorted(unknown))}")
     print("=" * 60)
     print("ETL Validation Report")
     print("=" * 60)
-    
+
+    t0 = perf_counter()
+    pool = get_pool(max(1, min(connections, len(checks))))
     try:
-        conn = get_conn()
-        cur = conn.cursor(dictionary=True)
-        
-        # Check 1: Raw records count
-        print("\n[Check 1] Raw Records Staging")
-        print("-" * 60)
-        cur.execute("SELECT COUNT(*) AS count FROM stg_properties_raw")
-        raw_count = cur.fetchone()["count"]
-        print(f"  Raw records in staging: {raw_count}")
-        
-        # Check 2: Dimension counts
-        print("\n[Check 2] Dimension Table Counts")
-        print("-" * 60)
-        dimensions = [
-            "dim_property",
-            "dim_address",
-            "dim_hoa",
-            "dim_valuation",
-            "dim_rehab",
-            "dim_tax"
-        ]
-        dim_counts = {}
-        for dim in dimensions:
-            cur.execute(f"SELECT COUNT(*) AS count FROM {dim}")
-            count = cur.fetchone()["count"]
-            dim_counts[dim] = count
-            print(f"  {dim}: {count} records")
-        
-        # Check 3: Fact table count
-        print("\n[Check 3] Fact Table")
-        print("-" * 60)
-        cur.execute("SELECT COUNT(*) AS count FROM fact_property_snapshot")
-        fact_count = cur.fetchone()["count"]
-        print(f"  Fact records: {fact_count}")
-        
-        # Check 4: Data integrity - orphaned records
-        print("\n[Check 4] Data Integrity Checks")
-        print("-" * 60)
-        
-        # Check for missing addresses
-        cur.execute("""
-            SELECT COUNT(*) AS count 
-            FROM fact_property_snapshot 
-            WHERE address_sk IS NULL
-        """)
-        bad_addr = cur.fetchone()["count"]
-        print(f"  Missing addresses: {bad_addr} (should be 0)")
-        
-        # Check for missing properties
-        cur.execute("""
-            SELECT COUNT(*) AS count 
-            FROM fact_property_snapshot fps
-            LEFT JOIN dim_property p ON p.property_sk = fps.property_sk
-            WHERE p.property_sk IS NULL
-        """)
-        bad_prop = cur.fetchone()["count"]
-        print(f"  Missing properties: {bad_prop} (should be 0)")
-        
-        # Check valuation integrity
-        cur.execute("""
-            SELECT COUNT(*) AS count
-            FROM fact_property_snapshot fps
-            LEFT JOIN dim_valuation v ON v.valuation_sk = fps.valuation_sk
-            WHERE (fps.valuation_sk IS NOT NULL) AND (v.provider IS NULL)
-        """)
-        val_mismatch = cur.fetchone()["count"]
-        print(f"  Valuation mismatches: {val_mismatch} (should be 0)")
-        
-        # Check 5: Sample data preview
-        print("\n[Check 5] Sample Data Preview")
-        print("-" * 60)
-        cur.execute("""
-            SELECT 
-                p.property_type,
-                p.square_feet,
-                a.city,
-                a.state,
-                v.estimate AS valuation,
-                t.tax_amount
-            FROM fact_property_snapshot fps
-            JOIN dim_property p ON p.property_sk = fps.property_sk
-            JOIN dim_address a ON a.address_sk = fps.address_sk
-            LEFT JOIN dim_valuation v ON v.valuation_sk = fps.valuation_sk
-            LEFT JOIN dim_tax t ON t.tax_sk = fps.tax_sk
-            LIMIT 5
-        """)
-        samples = cur.fetchall()
-        for i, sample in enumerate(samples, 1):
-            print(f"\n  Sample {i}:")
-            print(f"    Type: {sample['property_type']}")
-            print(f"    Square Feet: {sample['square_feet']}")
-            print(f"    Location: {sample['city']}, {sample['state']}")
-            print(f"    Valuation: ${sample['valuation']:,.2f}" if sample['valuation'] else "    Valuation: N/A")
-            print(f"    Tax: ${sample['tax_amount']:,.2f}" if sample['tax_amount'] else "    Tax: N/A")
-        
-        # Check 6: Summary statistics
-        print("\n[Check 6] Summary Statistics")
-        print("-" * 60)
-        
-        # Properties by type
-        cur.execute("""
-            SELECT property_type, COUNT(*) AS count
-            FROM dim_property
-            WHERE property_type IS NOT NULL
-            GROUP BY property_type
-            ORDER BY count DESC
-        """)
-        prop_types = cur.fetchall()
-        print("\n  Properties by Type:")
-        for pt in prop_types:
-            print(f"    {pt['property_type']}: {pt['count']}")
-        
-        # States represented
-        cur.execute("""
-            SELECT state, COUNT(*) AS count
-            FROM dim_address
-            WHERE state IS NOT NULL
-            GROUP BY state
-            ORDER BY count DESC
-            LIMIT 10
-        """)
-        states = cur.fetchall()
-        print("\n  Top 10 States by Property Count:")
-        for state in states:
-            print(f"    {state['state']}: {state['count']}")
-        
-        # Valuation statistics
-        cur.execute("""
-            SELECT 
-                COUNT(*) AS count,
-                AVG(estimate) AS avg_estimate,
-                MIN(estimate) AS min_estimate,
-                MAX(estimate) AS max_estimate
-            FROM dim_valuation
-            WHERE estimate IS NOT NULL
-        """)
-        val_stats = cur.fetchone()
-        if val_stats['count'] > 0:
-            print("\n  Valuation Statistics:")
-            print(f"    Count: {val_stats['count']}")
-            print(f"    Average: ${val_stats['avg_estimate']:,.2f}")
-            print(f"    Min: ${val_stats['min_estimate']:,.2f}")
-            print(f"    Max: ${val_stats['max_estimate']:,.2f}")
-        
-        # Final summary
-        print("\n" + "=" * 60)
-        print("Validation Summary")
-        print("=" * 60)
-        
-        issues = []
-        if raw_count == 0:
-            issues.append("No raw records found in staging table")
-        if fact_count == 0:
-            issues.append("No fact records found")
-        if bad_addr > 0:
-            issues.append(f"{bad_addr} fact records with missing addresses")
-        if bad_prop > 0:
-            issues.append(f"{bad_prop} fact records with missing properties")
-        if val_mismatch > 0:
-            issues.append(f"{val_mismatch} valuation foreign key mismatches")
-        
-        if issues:
-            print("\nIssues Found:")
-            for issue in issues:
-                print(f"  - {issue}")
-        else:
-            print("\nAll validation checks passed!")
-            print(f"\nSuccessfully processed {raw_count} raw records into {fact_count} fact records.")
-            print(f"Created {sum(dim_counts.values())} dimension records across {len(dim_counts)} tables.")
-        
-        print("=" * 60)
-        
-        cur.close()
-        conn.close()
-        
+        with pool.connection() as conn:
+            ctx = prepare(conn, full)
+        print(f"\n  Mode: {'full' if ctx['full'] else 'incremental'}, "
+              f"{len(checks)} checks on {pool.size} connections")
+        for table, (low, high) in ctx["ranges"].items():
+            print(f"  {table}: checking ids {low + 1}..{high}" if high > low else f"  {table}: no new rows")
+        if ctx["updated_since"] is not None:
+            print(f"  fact_property_snapshot: and rows updated since {ctx['updated_since']}")
+        results = run_checks(pool, checks, ctx, pool.size, timeout)
+        passed = all(r.status in ("pass", "skipped") for r in results)
+        if passed and ctx["totals"] is not None and not names:
+            # Only advanced after a clean run of every check, so rows with issues are checked again.
+            with pool.connection() as conn:
+                save_watermarks(conn, {table: (high, ctx["updated_to"] if table == "fact_property_snapshot" else None)
+                                       for table, (_, high) in ctx["ranges"].items()})
     except Exception as e:
         print(f"\nValidation failed with error: {str(e)}")
         import traceback
         traceback.print_exc()
         sys.exit(1)
+    finally:
+        pool.close()
+    elapsed = perf_counter() - t0
 
-if __name__ == "__main__":
-    run_validation()
+    section = None
+    sections = 0
+    for chk, result in zip(checks, results):
+        if chk.section != section:
+            section = chk.section
+            sections += 1
+            print(f"\n[Check {sections}] {section}")
+            print("-" * 60)
+        for line in result.lines:
+            print(line)
+        if result.status in ("timeout", "error"):
+            print(f"  {chk.name}: {result.status.upper()}")
 
+    # Final summary
+    print("\n" + "=" * 60)
+    print("Validation Summary")
+    print("=" * 60)
+    print(f"\n  {'check':<24}{'status':>8}{'seconds':>10}")
+    for result in results:
+        print(f"  {result.name:<24}{result.status:>8}{result.seconds:>10.3f}")
+    slowest = max(results, key=lambda r: r.seconds)
+    print(f"\n  Wall time {elapsed:.2f}s (slowest check: {slowest.name}, {slowest.seconds:.2f}s; "
+          f"sum of checks {sum(r.seconds for r in results):.2f}s)")
+
+    issues = [issue for result in results for issue in result.issues]
+    if issues:
+        print("\nIssues Found:")
+        for issue in issues:
+            print(f"  - {issue}")
+    else:
+        print("\nAll validation checks passed!")
+        values = {result.name: result.values for result in results}
+        if "raw_records" in values and "fact_records" in values:
+            print(f"\nSuccessfully processed {values['raw_records']['count']} raw records "
+                  f"into {values['fact_records']['count']} fact records.")
+        dim_counts = [values[f"{table}_count"]["count"] for table in DIMENSION_TABLES if f"{table}_count" in values]
+        if dim_counts:
+            print(f"Created {sum(dim_counts)} dimension records across {len(dim_counts)} tables.")
+
+    print("=" * 60)
+
+    if json_path:
+        report = {
+            "status": "pass" if passed else "fail",
+            "mode": "full" if ctx["full"] else "incremental",
+            "duration_s": round(elapsed, 3),
+            "ranges": {table: {"from_id": low + 1, "to_id": high} for table, (low, high) in ctx["ranges"].items()},
+            "checks": [result.as_dict() for result in results],
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(json_path)), exist_ok=True)
+        with open(json_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(report, indent=2, default=str) + "\n")
+        print(f"Report written to {json_path}")
+    return passed
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.list:
+        for chk in CHECKS:
+            print(f"{chk.name:<24}{chk.section}")
+        return
+    if not run_validation(args.full, args.connections, args.timeout, args.checks, args.json):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
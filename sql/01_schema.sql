@@ -37,7 +37,8 @@ CREATE TABLE IF NOT EXISTS dim_hoa (
   hoa_phone VARCHAR(50),
   hoa_email VARCHAR(255),
   rules_json JSON NULL,
-  UNIQUE KEY uk_hoa (hoa_name, hoa_monthly_fee)
+  row_hash CHAR(64) NOT NULL,
+  UNIQUE KEY uk_hoa_hash (row_hash)
 ) ENGINE=InnoDB;
 
 CREATE TABLE IF NOT EXISTS dim_valuation (
@@ -47,7 +48,8 @@ CREATE TABLE IF NOT EXISTS dim_valuation (
   estimate_low DECIMAL(12,2),
   estimate_high DECIMAL(12,2),
   as_of_date DATE,
-  UNIQUE KEY uk_val (provider, as_of_date, estimate, estimate_low, estimate_high)
+  row_hash CHAR(64) NOT NULL,
+  UNIQUE KEY uk_val_hash (row_hash)
 ) ENGINE=InnoDB;
 
 CREATE TABLE IF NOT EXISTS dim_rehab (
@@ -57,7 +59,8 @@ CREATE TABLE IF NOT EXISTS dim_rehab (
   interior DECIMAL(12,2),
   systems DECIMAL(12,2),
   as_of_date DATE,
-  UNIQUE KEY uk_rehab (as_of_date, total_estimate, exterior, interior, systems)
+  row_hash CHAR(64) NOT NULL,
+  UNIQUE KEY uk_rehab_hash (row_hash)
 ) ENGINE=InnoDB;
 
 CREATE TABLE IF NOT EXISTS dim_tax (
@@ -65,7 +68,8 @@ CREATE TABLE IF NOT EXISTS dim_tax (
   tax_year SMALLINT,
   assessed_value DECIMAL(12,2),
   tax_amount DECIMAL(12,2),
-  UNIQUE KEY uk_tax (tax_year, assessed_value, tax_amount)
+  row_hash CHAR(64) NOT NULL,
+  UNIQUE KEY uk_tax_hash (row_hash)
 ) ENGINE=InnoDB;
 
 CREATE TABLE IF NOT EXISTS fact_property_snapshot (
@@ -79,6 +83,7 @@ CREATE TABLE IF NOT EXISTS fact_property_snapshot (
   effective_date DATE NOT NULL,
   source_record_id BIGINT NULL,
   created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  UNIQUE KEY uk_fact_snapshot (property_sk, effective_date),
   CONSTRAINT fk_prop  FOREIGN KEY (property_sk)  REFERENCES dim_property(property_sk),
   CONSTRAINT fk_addr  FOREIGN KEY (address_sk)   REFERENCES dim_address(address_sk),
   CONSTRAINT fk_hoa   FOREIGN KEY (hoa_sk)       REFERENCES dim_hoa(hoa_sk),
@@ -86,3 +91,20 @@ CREATE TABLE IF NOT EXISTS fact_property_snapshot (
   CONSTRAINT fk_rehab FOREIGN KEY (rehab_sk)     REFERENCES dim_rehab(rehab_sk),
   CONSTRAINT fk_tax   FOREIGN KEY (tax_sk)       REFERENCES dim_tax(tax_sk)
 ) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS etl_checkpoint (
+  file_id CHAR(64) PRIMARY KEY,
+  source_path VARCHAR(1024) NOT NULL,
+  source_size BIGINT NOT NULL,
+  source_sha256 CHAR(64) NOT NULL,
+  records_committed BIGINT NOT NULL DEFAULT 0,
+  chunks_committed INT NOT NULL DEFAULT 0,
+  status VARCHAR(16) NOT NULL DEFAULT 'running',
+  updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS etl_record_fingerprint (
+  property_bk VARCHAR(128) PRIMARY KEY,
+  content_hash CHAR(64) NOT NULL,
+  updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB;
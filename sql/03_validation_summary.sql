@@ -0,0 +1,15 @@
+-- Running row counts of the ETL tables, updated by the ETL in the transaction that
+-- writes the rows. max_id is the highest id counted so far.
+CREATE TABLE IF NOT EXISTS etl_table_totals (
+  table_name VARCHAR(64) PRIMARY KEY,
+  row_count BIGINT NOT NULL DEFAULT 0,
+  max_id BIGINT NOT NULL DEFAULT 0,
+  updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB;
+
+-- Highest id per table already checked by validate.py; incremental runs check only newer rows.
+CREATE TABLE IF NOT EXISTS etl_validation_watermark (
+  table_name VARCHAR(64) PRIMARY KEY,
+  last_id BIGINT NOT NULL DEFAULT 0,
+  validated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB;
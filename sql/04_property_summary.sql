@@ -0,0 +1,19 @@
+-- Property count and valuation, tax and HOA rollups per (state, city, property_type)
+-- over the current snapshot of every property, kept up to date by the ETL per chunk.
+-- NULL states, cities and property types are grouped under ''.
+CREATE TABLE IF NOT EXISTS agg_property_summary (
+  state VARCHAR(100) NOT NULL,
+  city VARCHAR(100) NOT NULL,
+  property_type VARCHAR(64) NOT NULL,
+  property_count BIGINT NOT NULL DEFAULT 0,
+  valuation_count BIGINT NOT NULL DEFAULT 0,
+  valuation_sum DECIMAL(20,2) NOT NULL DEFAULT 0,
+  valuation_min DECIMAL(12,2) NULL,
+  valuation_max DECIMAL(12,2) NULL,
+  tax_count BIGINT NOT NULL DEFAULT 0,
+  tax_sum DECIMAL(20,2) NOT NULL DEFAULT 0,
+  hoa_count BIGINT NOT NULL DEFAULT 0,
+  hoa_fee_sum DECIMAL(20,2) NOT NULL DEFAULT 0,
+  updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (state, city, property_type)
+) ENGINE=InnoDB;
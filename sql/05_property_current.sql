@@ -0,0 +1,33 @@
+-- Latest snapshot of every property with the attributes most reads need already
+-- joined in, upserted by the ETL alongside the facts. Keyed by property_sk; property
+-- attributes follow dim_property, the rest follows the fact with the latest effective_date.
+CREATE TABLE IF NOT EXISTS fact_property_current (
+  property_sk BIGINT PRIMARY KEY,
+  property_bk VARCHAR(128) NOT NULL,
+  property_type VARCHAR(64) NULL,
+  year_built SMALLINT NULL,
+  square_feet INT NULL,
+  bedrooms DECIMAL(4,1) NULL,
+  bathrooms DECIMAL(4,1) NULL,
+  effective_date DATE NOT NULL,
+  address_sk BIGINT NOT NULL,
+  address_line1 VARCHAR(255),
+  city VARCHAR(100),
+  state VARCHAR(100),
+  postal_code VARCHAR(20),
+  latitude DECIMAL(9,6),
+  longitude DECIMAL(9,6),
+  valuation_sk BIGINT NULL,
+  valuation_estimate DECIMAL(12,2) NULL,
+  tax_sk BIGINT NULL,
+  tax_amount DECIMAL(12,2) NULL,
+  hoa_sk BIGINT NULL,
+  hoa_monthly_fee DECIMAL(10,2) NULL,
+  rehab_sk BIGINT NULL,
+  rehab_total DECIMAL(12,2) NULL,
+  source_record_id BIGINT NULL,
+  updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  UNIQUE KEY uk_current_bk (property_bk)
+) ENGINE=InnoDB;
+
+CREATE INDEX ix_current_location ON fact_property_current (state, city);
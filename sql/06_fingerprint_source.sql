@@ -0,0 +1,6 @@
+-- Where each content fingerprint was loaded from: source_key identifies the input file,
+-- mapping config and dedupe rule of the run that stored it, source_offset the position
+-- of the property's last copy loaded from that input. A rerun of the same input skips
+-- earlier copies of a property that a later copy superseded in the same file.
+ALTER TABLE etl_record_fingerprint ADD COLUMN source_key CHAR(64) NULL;
+ALTER TABLE etl_record_fingerprint ADD COLUMN source_offset BIGINT NULL;
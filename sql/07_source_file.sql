@@ -0,0 +1,5 @@
+-- Input file each fact was loaded from: etl_checkpoint.file_id, which identifies the
+-- file by path, size and SHA-256. source_record_id is the record's byte offset in that
+-- file. NULL for facts loaded before the file was recorded.
+ALTER TABLE fact_property_snapshot ADD COLUMN source_file_id CHAR(64) NULL;
+ALTER TABLE fact_property_current ADD COLUMN source_file_id CHAR(64) NULL;
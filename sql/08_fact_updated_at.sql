@@ -0,0 +1,6 @@
+-- When each fact was last written. Facts are upserted in place on their natural key,
+-- so validate.py checks the rows updated since its last clean run as well as new ids;
+-- last_updated_at is the newest updated_at that run covered.
+ALTER TABLE fact_property_snapshot ADD COLUMN updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP;
+CREATE INDEX ix_fact_updated ON fact_property_snapshot (updated_at);
+ALTER TABLE etl_validation_watermark ADD COLUMN last_updated_at TIMESTAMP NULL;